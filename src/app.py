@@ -1,28 +1,86 @@
-import cv2
+import os
 import numpy as np
 from PIL import Image
 
 import streamlit as st
-from py3dbp import Packer, Bin, Item
 
 from utils.plotly_utils import *
+from packing import IncrementalPacker, LayoutCache, pack_heightmap
+from packing.exact import MAX_EXACT_ITEMS, pack_exact_shelves
 import detect_objects as dobj
-from object_labeling import label_image
+from vision_cache import VisionCache
+from label_cache import LabelCache
+from calibration import Calibration, CalibrationCache
+from detect_shelves import measure_shelves
+import object_labeling
 
 
+# Directory for packing results that survive server restarts
+LAYOUT_CACHE_DIR = os.environ.get(
+    "LAYOUT_CACHE_DIR", os.path.join(os.path.dirname(__file__), "..", ".cache", "layouts")
+)
+
+
+@st.cache_resource
+def get_layout_cache():
+    # Shared by all sessions of this server
+    return LayoutCache(max_entries=128, directory=LAYOUT_CACHE_DIR)
+
+
+@st.cache_resource
+def get_vision_cache():
+    # Decoded photos, crops, labels and pixel measurements, shared by all sessions
+    return VisionCache(max_bytes=512 * 1024 ** 2)
+
+
+# File of perceptual-hash labels that survive server restarts
+LABEL_CACHE_PATH = os.environ.get(
+    "LABEL_CACHE_PATH", os.path.join(os.path.dirname(__file__), "..", ".cache", "labels.json")
+)
+
+
+@st.cache_resource
+def get_label_cache():
+    # Labels of items photographed before, matched by perceptual hash, shared by all sessions
+    return LabelCache(max_entries=4096, path=LABEL_CACHE_PATH)
+
+
+def label_crops(crops):
+    # Near-duplicates of earlier crops reuse their label; the rest go through the model cascade
+    return label_cache.label(crops, object_labeling.label_cascade)
+
+
+@st.cache_data
+def measure_shelves_cached(top_images, front_images, ref_real):
+    # Inner shelf dimensions per photo pair, recomputed only for new uploads or reference sizes
+    return measure_shelves(list(top_images), list(front_images), ref_real, max_side=dobj.PYRAMID_MAX_SIDE)
+
 
 # Hold states of items and shelves
 if "items" not in st.session_state:
     st.session_state["items"] = []
 if "shelves" not in st.session_state:
     st.session_state["shelves"] = []
+if "next_item_id" not in st.session_state:
+    st.session_state["next_item_id"] = 0
+if "calibrations" not in st.session_state:
+    # Camera calibrations of this session, so later photos need no reference object
+    st.session_state["calibrations"] = CalibrationCache()
 
 
 # Define pages
 st.sidebar.title("Navigation")
 page = st.sidebar.radio("Go to", ["Home", "Visualization"])
 
+layout_cache = get_layout_cache()
+vision_cache = get_vision_cache()
+label_cache = get_label_cache()
+
 if page == "Home":
+    # Load the labeling models in the background while photos are uploaded; Visualization never needs them
+    object_labeling.warmup(object_labeling.SMALL_MODEL_NAME)
+    object_labeling.warmup()
+
     st.title("Upload Images and Configure Dimensions")
 
     # Upload item images
@@ -44,21 +102,94 @@ if page == "Home":
             if len(top_views) != len(front_views):
                 st.error("The number of top view and front view images must match.")
             else:
-                for i in range(len(top_views)):
-                    st.subheader(f"Item {i + 1}: Configure Dimensions")
-
-                    # Convert the uploaded file to an OpenCV image
-                    top_file_bytes = np.asarray(bytearray(top_views[i].read()), dtype=np.uint8)
-                    image_top = cv2.imdecode(top_file_bytes, cv2.IMREAD_COLOR)
-                    front_file_bytes = np.asarray(bytearray(front_views[i].read()), dtype=np.uint8)
-                    image_front = cv2.imdecode(front_file_bytes, cv2.IMREAD_COLOR)
-                    
-                    # Crop the image to the object and label it
-                    cropped_image = dobj.crop_to_object(image_top)
-                    item_name_val = label_image(cropped_image)
+                calibrations = st.session_state["calibrations"]
+                calibrated = False
+                if "top" in calibrations and "front" in calibrations:
+                    calibrated = st.checkbox(
+                        "Use Saved Camera Calibration", value=True,
+                        help="Measure with the calibrated cameras, so the photos need no reference object",
+                    )
+                    if st.button("Clear Camera Calibration"):
+                        calibrations.clear()
+                        st.rerun()
+                multi = calibrated or st.checkbox(
+                    "Several items per photo pair", value=False,
+                    help="Measure every item placed left of the reference, instead of one item per photo pair",
+                )
+
+                pairs = [(top.getvalue(), front.getvalue()) for top, front in zip(top_views, front_views)]
+                if calibrated:
+                    # Pairs photographed at another size than the calibration fall back to the reference
+                    measured_items = vision_cache.measure_calibrated_batch(
+                        pairs, label_crops, calibrations, max_side=dobj.PYRAMID_MAX_SIDE
+                    )
+                else:
+                    # Decode, crop, label and measure all photo pairs concurrently, once; reruns hit the cache
+                    measured_items = vision_cache.measure_batch(
+                        pairs, label_crops, max_side=dobj.PYRAMID_MAX_SIDE, multi=multi
+                    )
+
+                for i, measured in enumerate(measured_items):
+                    st.subheader(f"{'Photo' if multi else 'Item'} {i + 1}: Configure Dimensions")
+                    if measured["error"]:
+                        st.error(f"Could not measure {'photo' if multi else 'item'} {i + 1}: {measured['error']}")
+                        continue
+
+                    if calibrated and "obj_real" in measured:
+                        objs_real = measured["obj_real"]
+                    elif multi:
+                        if calibrated:
+                            st.info(f"Photo {i + 1} differs in size from the calibration photos, "
+                                    "so it is measured with the reference object.")
+                        # Reference object details, shared by every item in the photo pair
+                        ref_width = st.number_input(f"Known Width of Reference Object (Photo {i + 1})", value=5.5, step=0.1)
+                        ref_length = st.number_input(f"Known Length of Reference Object (Photo {i + 1})", value=5.5, step=0.1)
+                        ref_height = st.number_input(f"Known Height of Reference Object (Photo {i + 1})", value=5.5, step=0.1)
+                        ref_real = [ref_height, ref_width, ref_length]
+                        objs_real = dobj.get_all_real_dimensions(measured["ref_px"], measured["obj_px"], ref_real)
+                        st.write(f"Reference dims (pixels): {measured['ref_px']}")
+
+                    if multi:
+                        new_items = []
+                        for j, (crop, label, obj_real) in enumerate(zip(measured["crops"], measured["labels"], objs_real)):
+                            col1, col2, col3 = st.columns([1, 3, 1])
+                            with col1:
+                                st.image(crop, channels="BGR", use_container_width=True)
+                            if np.isnan(obj_real).any():
+                                with col2:
+                                    st.warning(f"Object {j + 1} was not found in the front view.")
+                                continue
+                            with col2:
+                                item_name = st.text_input(f"Photo {i + 1} Object {j + 1} Name", value=label)
+                                st.write(f"Object dims (real-world): {tuple(obj_real.tolist())} cm")
+                            with col3:
+                                quantity = st.number_input(
+                                    f"Photo {i + 1} Object {j + 1} Quantity", value=1, min_value=1, step=1
+                                )
+                            new_items.append((item_name, int(quantity), tuple(obj_real.tolist())))
+
+                        if new_items and st.button(f"Add All Items from Photo {i + 1}"):
+                            for item_name, quantity, obj_real in new_items:
+                                st.session_state["items"].append(
+                                    {
+                                        "id": st.session_state["next_item_id"],
+                                        "name": item_name,
+                                        "rotation": 1,
+                                        "allowed_rotations": None,
+                                        "quantity": quantity,
+                                        "dimensions": obj_real,
+                                    }
+                                )
+                                st.session_state["next_item_id"] += 1
+                            st.success(f"Added {len(new_items)} items from photo {i + 1}")
+                        continue
+
+                    item_name_val = measured["label"]
 
                     item_name = st.text_input(f"Item {i + 1} Name", value=item_name_val)
+                    st.caption(f"Label confidence: {measured['confidence']:.0%}")
                     rotation = 1
+                    quantity = st.number_input(f"Item {i + 1} Quantity", value=1, min_value=1, step=1)
 
                     # Reference object details for top view
                     st.subheader("Reference Object Details (Top View)")
@@ -80,7 +211,7 @@ if page == "Home":
                    
                     
                     ref_real = [ref_height, ref_width, ref_length]
-                    ref_px, obj_px = dobj.get_objects(image_top, image_front)
+                    ref_px, obj_px = measured["ref_px"], measured["obj_px"]
                     obj_real = dobj.get_real_dimensions(ref_px, obj_px, ref_real)
 
                     # Simply display the opencv computed values:
@@ -89,15 +220,35 @@ if page == "Home":
                     st.write(f"Object dims (pixels): {obj_px}")
                     st.write(f"Object dims (real-world): {obj_real} cm")
 
+                    if st.button(f"Save Camera Calibration from Item {i + 1}"):
+                        # The reference shows its width and length from the top, its width and height from the front
+                        top_calibration = Calibration.from_reference(measured["image_top"], (ref_width, ref_length))
+                        front_calibration = Calibration.from_reference(measured["image_front"], (ref_width, ref_height))
+                        failed = [view for view, calibration in (("top", top_calibration), ("front", front_calibration))
+                                  if calibration is None]
+                        if failed:
+                            st.error(f"Could not calibrate from the {' and '.join(failed)} view of item {i + 1}: "
+                                     "no reference object found.")
+                        else:
+                            calibrations.put("top", top_calibration)
+                            calibrations.put("front", front_calibration)
+                            st.success("Camera calibration saved: later photos from these cameras need no reference object")
 
                     if st.button(f"Add Item {i + 1}"):
                         st.session_state["items"].append(
-                            {"name": item_name, "rotation": rotation, "dimensions": obj_real}
+                            {
+                                "id": st.session_state["next_item_id"],
+                                "name": item_name,
+                                "rotation": rotation,
+                                "allowed_rotations": None,
+                                "quantity": int(quantity),
+                                "dimensions": obj_real,
+                            }
                         )
+                        st.session_state["next_item_id"] += 1
                         st.success(f"Item '{item_name}' added with dimensions: {obj_real} and rotation {rotation}")
 
     # Upload shelf images
-    #TODO: Add shelf detection and dimension calculation
     st.header("Shelves")
 
     # Add a checklist for default sizes or custom
@@ -142,72 +293,60 @@ if page == "Home":
             if len(top_views_shelf) != len(front_views_shelf):
                 st.error("The number of top view and front view images for shelves must match.")
             else:
-                # Separate section for each shelf
-                for i in range(len(top_views_shelf)):
+                # Reference object details, shared by every shelf photo
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    ref_width_shelf = st.number_input("Known Width of Reference Object (Shelves)", value=25.0, step=0.1)
+                with col2:
+                    ref_length_shelf = st.number_input("Known Length of Reference Object (Shelves)", value=15.0, step=0.1)
+                with col3:
+                    ref_height_shelf = st.number_input("Known Height of Reference Object (Shelves)", value=8.0, step=0.1)
+
+                # Measure the inside of every shelf at once; reruns with the same uploads hit the cache
+                measured_shelves = measure_shelves_cached(
+                    tuple(top.getvalue() for top in top_views_shelf),
+                    tuple(front.getvalue() for front in front_views_shelf),
+                    (ref_width_shelf, ref_length_shelf, ref_height_shelf),
+                )
+
+                rotation = 0
+                new_shelves = []
+                for i, measured in enumerate(measured_shelves):
                     st.markdown(f"### Shelf {i + 1}: Configure Dimensions")
-                    rotation = 0
-
-                    col1, col2 = st.columns(2)
-
-                    # Top view reference object details
-                    with col1:
-                        st.markdown("**Reference Object Details (Top View)**")
-                        ref_width_shelf = st.number_input(
-                            f"Known Width of Reference Object (Shelf {i + 1})", value=25.0, step=0.1
-                        )
-                        ref_length_shelf = st.number_input(
-                            f"Known Length of Reference Object (Shelf {i + 1})", value=15.0, step=0.1
-                        )
-                        ref_size_px_top_shelf = st.number_input(
-                            f"Pixel Size of Reference Object in Top View (Shelf {i + 1})", value=100.0, step=1.0
-                        )
-
-                        shelf_width_px = st.number_input(
-                            f"Pixel Width of Shelf in Top View (Shelf {i + 1})", value=50.0, step=1.0
-                        )
-
-                        shelf_length_px = st.number_input(
-                            f"Pixel Length of Shelf in Top View (Shelf {i + 1})", value=50.0, step=1.0
-                        )
-
-                    # Front view reference object details
-                    with col2:
-                        st.markdown("**Reference Object Details (Front View)**")
-                        ref_height_shelf = st.number_input(
-                            f"Known Height of Reference Object (Shelf {i + 1})", value=8.0, step=0.1
-                        )
-                        ref_size_px_front_shelf = st.number_input(
-                            f"Pixel Size of Reference Object in Front View (Shelf {i + 1})", value=100.0, step=1.0
-                        )
-
-                        shelf_height_px = st.number_input(
-                            f"Pixel Height of Shelf in Front View (Shelf {i + 1})", value=50.0, step=1.0
-                        )
+                    if measured["error"]:
+                        st.error(f"Could not measure shelf {i + 1}: {measured['error']}")
+                        continue
+
+                    # Measured inner dimensions, editable in case the detection needs a correction
+                    col1, col2, col3 = st.columns(3)
+                    labels = ["Width", "Height", "Depth"]
+                    dimensions_shelf = []
+                    for col, label, value in zip((col1, col2, col3), labels, measured["dimensions"]):
+                        with col:
+                            dimensions_shelf.append(
+                                st.number_input(f"{label} of Shelf {i + 1}", value=float(value), min_value=0.0, step=0.1)
+                            )
+                    new_shelves.append(dimensions_shelf)
 
                     if st.button(f"Add Shelf {i + 1}", key=f"add_shelf_{i}"):
-                        # Calculate dimensions
-                        ref_dims_shelf = [ref_width_shelf, ref_length_shelf, ref_height_shelf]
-                        ref_size_px_shelf = [
-                            ref_size_px_top_shelf,
-                            ref_size_px_top_shelf,
-                            ref_size_px_front_shelf,
-                        ]
-                        shelf_size_px = [shelf_width_px, shelf_length_px, shelf_height_px]
-                        dimensions_shelf = [
-                            (dim * obj_px / ref_px)
-                            for dim, obj_px, ref_px in zip(ref_dims_shelf, shelf_size_px, ref_size_px_shelf)
-                        ]
-
-                        st.session_state["shelves"].append(
-                            {"rotation": rotation, "dimensions": dimensions_shelf}
-                        )
+                        st.session_state["shelves"].append({"rotation": rotation, "dimensions": dimensions_shelf})
                         st.success(f"Shelf added with dimensions: {dimensions_shelf} and rotation {rotation}")
 
+                if len(new_shelves) > 1 and st.button("Add All Shelves"):
+                    for dimensions_shelf in new_shelves:
+                        st.session_state["shelves"].append({"rotation": rotation, "dimensions": dimensions_shelf})
+                    st.success(f"Added {len(new_shelves)} shelves")
 
     # Display current items and shelves
     st.write("Current Items:")
-    for item in st.session_state["items"]:
-        items = st.write(f"- {item['name']}: {item['dimensions']}")
+    for item in list(st.session_state["items"]):
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            st.write(f"- {item['name']}: {item['dimensions']} x {item.get('quantity', 1)}")
+        with col2:
+            if st.button("Remove", key=f"remove_item_{item['id']}"):
+                st.session_state["items"].remove(item)
+                st.rerun()
 
     st.write("Current Shelves:")
     for shelf in st.session_state["shelves"]:
@@ -219,33 +358,84 @@ elif page == "Visualization":
     if not st.session_state["items"] or not st.session_state["shelves"]:
         st.warning("Please upload items and shelf dimensions first!")
     else:
-        # Instantiate the packer
-        packer = Packer()
-        
-        for shelf in st.session_state["shelves"]:
-            packer.add_bin(Bin('shelf', 
-                          width=float(shelf['dimensions'][0]), 
-                          height=float(shelf['dimensions'][1]), 
-                          depth=float(shelf['dimensions'][2]), 
-                          max_weight=10000)
-            )
-        
-        # Add items to be packed
-        for item in st.session_state["items"]:
-            packer.add_item(Item(
-                name=item['name'],
-                width=float(item['dimensions'][0]),
-                height=float(item['dimensions'][1]),
-                depth=float(item['dimensions'][2]),
-                weight=1
-            ))
-
-        packer.pack()
-        fitted_items, bin_size = parse_packer_output(packer)
-
-        # Visualize the packing
         colors = ["red", "blue", "green", "yellow", "orange", "purple", "cyan"]
-        frames = create_packing_visualization(fitted_items, bin_size, colors)
-        for fig in frames:
-            st.plotly_chart(fig)
 
+        # Packing mode
+        mode = st.radio("Packing Mode", ["Incremental", "Search", "Heightmap", "Exact"], horizontal=True)
+        if mode == "Search":
+            col1, col2 = st.columns(2)
+            with col1:
+                budget = st.slider("Search time budget (seconds)", 0.5, 10.0, 2.0, step=0.5)
+            with col2:
+                seed = st.number_input("Search seed", value=0, step=1)
+
+            # Show the best layout found so far while the search runs
+            progress = st.empty()
+
+            def show_improvement(placements, unfitted_items, utilization):
+                with progress.container():
+                    st.info(f"Best layout so far: {utilization:.1%} of shelf volume used")
+                    for i, (fitted_items, bin_size) in enumerate(placements):
+                        st.plotly_chart(create_packing_figure(fitted_items, bin_size, colors, title=f"Shelf {i + 1}"))
+
+            placements, unfitted_items, utilization = layout_cache.search_pack(
+                st.session_state["items"], st.session_state["shelves"],
+                budget=budget, seed=int(seed), on_improve=show_improvement,
+            )
+            progress.empty()
+            st.success(f"Best layout found uses {utilization:.1%} of shelf volume")
+        elif mode == "Heightmap":
+            # Grid-based packing for inventories in the thousands
+            resolution = st.number_input("Grid Resolution", value=0.5, min_value=0.1, step=0.1)
+            placements, unfitted_items = pack_heightmap(
+                st.session_state["items"], st.session_state["shelves"], resolution=resolution
+            )
+        elif mode == "Exact":
+            if sum(item.get("quantity", 1) for item in st.session_state["items"]) > MAX_EXACT_ITEMS:
+                st.error(f"Exact packing supports at most {MAX_EXACT_ITEMS} items.")
+                st.stop()
+            time_limit = st.slider("Solver time limit (seconds)", 1.0, 60.0, 10.0, step=1.0)
+            placements, unfitted_items, gaps = pack_exact_shelves(
+                st.session_state["items"], st.session_state["shelves"], time_limit=time_limit
+            )
+            for i, gap in enumerate(gaps):
+                if gap > 0:
+                    st.info(f"Shelf {i + 1}: best layout found within the time limit, optimality gap {gap:.1%}")
+                else:
+                    st.info(f"Shelf {i + 1}: proven optimal layout, every item supported")
+        else:
+            # Update the previous layout with added and removed items only
+            if "packer" not in st.session_state:
+                packer = IncrementalPacker(st.session_state["shelves"], cache=layout_cache)
+                packer.repack(st.session_state["items"])
+                st.session_state["packer"] = packer
+            packer = st.session_state["packer"]
+
+            if st.button("Full Repack"):
+                packer.repack(st.session_state["items"])
+            packer.sync(st.session_state["items"], st.session_state["shelves"])
+            placements, unfitted_items = packer.placements, packer.unfitted_items
+
+        if unfitted_items:
+            st.warning(
+                f"{len(unfitted_items)} item(s) did not fit in any shelf: "
+                + ", ".join(item["name"] for item in unfitted_items)
+            )
+
+        # Visualize the packing of each shelf
+        for i, (fitted_items, bin_size) in enumerate(placements):
+            st.subheader(f"Shelf {i + 1}")
+            frames = create_packing_visualization(fitted_items, bin_size, colors)
+            for fig in frames:
+                st.plotly_chart(fig)
+
+st.sidebar.caption(f"Layout cache: {layout_cache.hits} hits, {layout_cache.misses} misses")
+st.sidebar.caption(
+    f"Vision cache: {vision_cache.hits} hits, {vision_cache.misses} misses, {vision_cache.nbytes / 1e6:.0f} MB"
+)
+st.sidebar.caption(f"Label cache: {label_cache.hits} hits, {label_cache.misses} misses, {len(label_cache)} entries")
+if object_labeling.cascade_stats["crops"]:
+    stats = object_labeling.cascade_stats
+    st.sidebar.caption(
+        f"Labeling: {stats['escalated']} of {stats['crops']} crops escalated to the base model"
+    )
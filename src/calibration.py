@@ -0,0 +1,223 @@
+import cv2
+import numpy as np
+from imutils import perspective
+
+import detect_objects as dobj
+
+# Chessboard calibration targets, counted in inner corners
+CHESSBOARD_SIZE = (7, 7)
+
+
+def _quad(contour):
+    """
+    Four ordered corners (tl, tr, br, bl) of a roughly rectangular contour.
+
+    Perspective turns a rectangle into a general quadrilateral, so the
+    contour's convex hull is simplified until four vertices remain. Quads
+    that do not cover the hull fall back to its minimum area rectangle.
+    """
+    hull = cv2.convexHull(contour)
+    perimeter = cv2.arcLength(hull, True)
+    for epsilon in (0.02, 0.04, 0.06, 0.08, 0.1):
+        approx = cv2.approxPolyDP(hull, epsilon * perimeter, True)
+        if len(approx) == 4 and abs(cv2.contourArea(approx) - cv2.contourArea(hull)) < 0.05 * cv2.contourArea(hull):
+            return perspective.order_points(approx.reshape(4, 2).astype(np.float32))
+    return perspective.order_points(cv2.boxPoints(cv2.minAreaRect(contour)))
+
+
+class Calibration:
+    """
+    Homography from one camera's photos onto a metric plane.
+
+    Computed once from a reference of known size, or a chessboard, lying in
+    the measured plane, and reused for every later photo from the same camera
+    position, so those photos need no reference. The rectified plane keeps
+    roughly the photo's resolution, at px_per_cm pixels per centimetre.
+
+    Objects much taller than the reference are measured on the reference's
+    plane, so keep the camera at the same distance as when calibrating.
+    """
+
+    def __init__(self, homography, px_per_cm, shape):
+        self.homography = np.asarray(homography, dtype=np.float64)
+        self.px_per_cm = float(px_per_cm)
+        self.shape = tuple(shape[:2])
+
+    @classmethod
+    def from_quad(cls, corners, real_size, shape):
+        """
+        Calibrate from the four image corners of a rectangle of known size.
+
+        Args:
+            corners (numpy.ndarray): (4, 2) corners ordered tl, tr, br, bl.
+            real_size (tuple): Real-world (width, length) of the rectangle in cm.
+            shape (tuple): Shape of the photo.
+
+        Returns:
+            Calibration: The calibration of the photo's camera.
+        """
+        corners = np.asarray(corners, dtype=np.float32)
+        width, length = real_size
+        sides = np.linalg.norm(corners - np.roll(corners, -1, axis=0), axis=1)
+        px_per_cm = sides.sum() / (2 * (width + length))
+        target = np.float32([[0, 0], [width, 0], [width, length], [0, length]]) * px_per_cm
+        return cls(cv2.getPerspectiveTransform(corners, target), px_per_cm, shape)
+
+    @classmethod
+    def from_reference(cls, image, real_size):
+        """
+        Calibrate from the reference object, the rightmost object as in detect_objects.get_objects.
+
+        Args:
+            image (numpy.ndarray or dict): Photo, or its detect_objects.preprocess output.
+            real_size (tuple): Real-world (width, length) of the reference's visible face in cm.
+
+        Returns:
+            Calibration: The calibration, or None if no object was found.
+        """
+        prep = dobj._preprocessed(image)
+        contours = dobj.object_contours(prep["contours"], prep["image"].shape) or prep["contours"][:1]
+        if not contours:
+            return None
+        reference = max(contours, key=lambda c: cv2.boundingRect(c)[0] + cv2.boundingRect(c)[2] / 2)
+        return cls.from_quad(_quad(reference), real_size, prep["image"].shape)
+
+    @classmethod
+    def from_chessboard(cls, image, square_cm, pattern=CHESSBOARD_SIZE):
+        """
+        Calibrate from a printed chessboard lying in the measured plane.
+
+        Args:
+            image (numpy.ndarray): BGR photo.
+            square_cm (float): Side of one chessboard square in cm.
+            pattern (tuple): Inner corners per row and column.
+
+        Returns:
+            Calibration: The calibration, or None if the chessboard was not found.
+        """
+        grey = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        found, corners = cv2.findChessboardCorners(grey, pattern)
+        if not found:
+            return None
+        corners = cv2.cornerSubPix(
+            grey, corners, (11, 11), (-1, -1), (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 30, 0.001)
+        ).reshape(-1, 2)
+        cols, rows = pattern
+        grid = np.mgrid[0:cols, 0:rows].T.reshape(-1, 2).astype(np.float32) * square_cm
+        # Scale so that the board keeps its size in pixels
+        px_per_cm = np.linalg.norm(corners[cols - 1] - corners[0]) / ((cols - 1) * square_cm)
+        homography, _ = cv2.findHomography(corners, grid * px_per_cm)
+        return cls(homography, px_per_cm, image.shape)
+
+    def to_plane(self, points):
+        """Map (n, 2) image points onto the rectified plane, in pixels."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 1, 2)
+        return cv2.perspectiveTransform(points, self.homography).reshape(-1, 2)
+
+    def measure(self, contour):
+        """
+        Real-world (dA, dB) of an object in the measured plane, as get_dims measures pixels.
+
+        Only the contour's points are transformed, not the photo.
+        """
+        rectified = self.to_plane(contour).astype(np.float32)
+        (_, _), (w, h), _ = cv2.minAreaRect(rectified)
+        return round(h / self.px_per_cm, dobj.DIMENSION_DECIMALS), round(w / self.px_per_cm, dobj.DIMENSION_DECIMALS)
+
+    def warp_region(self, image, region):
+        """
+        Perspective-correct only a region of interest of a photo.
+
+        Args:
+            image (numpy.ndarray): Photo from the calibrated camera.
+            region (tuple): (x, y, w, h) bounding rectangle in the photo.
+
+        Returns:
+            numpy.ndarray: The rectified region, at px_per_cm pixels per centimetre.
+        """
+        x, y, w, h = region
+        corners = self.to_plane([[x, y], [x + w, y], [x + w, y + h], [x, y + h]])
+        x0, y0 = np.floor(corners.min(axis=0))
+        x1, y1 = np.ceil(corners.max(axis=0))
+        # Shift the output window onto the region, so only its pixels are computed
+        shift = np.array([[1, 0, -x0], [0, 1, -y0], [0, 0, 1]])
+        size = (int(x1 - x0), int(y1 - y0))
+        return cv2.warpPerspective(image, shift @ self.homography, size)
+
+
+class CalibrationCache:
+    """
+    Calibrations per camera for one session.
+
+    Cameras are told apart by a name chosen by the user, e.g. "top" and
+    "front", and by photo size, since a different resolution means a
+    different camera or setting.
+    """
+
+    def __init__(self):
+        self._calibrations = {}
+
+    def __contains__(self, camera):
+        return camera in self._calibrations
+
+    def get(self, camera, shape=None):
+        """The camera's calibration, or None if missing or calibrated at another photo size."""
+        calibration = self._calibrations.get(camera)
+        if calibration is None or (shape is not None and calibration.shape != tuple(shape[:2])):
+            return None
+        return calibration
+
+    def put(self, camera, calibration):
+        self._calibrations[camera] = calibration
+
+    def clear(self, camera=None):
+        if camera is None:
+            self._calibrations.clear()
+        else:
+            self._calibrations.pop(camera, None)
+
+
+def measure_calibrated(im_td, im_side, top_calibration, front_calibration, max_side=None):
+    """
+    Measure every object in a photo pair from calibrated cameras, without a reference.
+
+    Args:
+        im_td (numpy.ndarray): Top-down view image.
+        im_side (numpy.ndarray): Side view image.
+        top_calibration (Calibration): Calibration of the top camera.
+        front_calibration (Calibration): Calibration of the front camera.
+        max_side (int, optional): Pyramid mode setting passed to detect_objects.preprocess.
+
+    Returns:
+        tuple: An (n, 3) array of real-world dimensions of the objects in the
+        top view from left to right, NaN rows where the views do not match, and
+        the perspective-corrected crop of each object from the top view.
+    """
+    for image, camera in ((im_td, top_calibration), (im_side, front_calibration)):
+        if image.shape[:2] != camera.shape:
+            raise ValueError(
+                f"Photo of {image.shape[1]}x{image.shape[0]} pixels, but the camera was calibrated "
+                f"at {camera.shape[1]}x{camera.shape[0]}."
+            )
+
+    prep_top = dobj.preprocess(im_td, max_side=max_side, refine=None)
+    prep_front = dobj.preprocess(im_side, max_side=max_side, refine=None)
+
+    def objects(prep, calibration):
+        contours = dobj.object_contours(prep["contours"], prep["image"].shape)
+        x = np.array([calibration.to_plane(c)[:, 0].mean() for c in contours])
+        order = np.argsort(x)
+        contours = [contours[i] for i in order]
+        dims = [calibration.measure(c) for c in contours]
+        # Both planes are metric, so positions compare in cm once shifted to the leftmost object
+        x = (x[order] - x[order][:1]) / calibration.px_per_cm
+        return contours, dims, x
+
+    top_contours, top_dims, top_x = objects(prep_top, top_calibration)
+    _, front_dims, front_x = objects(prep_front, front_calibration)
+    if not top_dims or not front_dims:
+        raise ValueError("No objects found in one of the views.")
+
+    dims = dobj.match_views(top_dims, front_dims, top_x, front_x)
+    crops = [top_calibration.warp_region(im_td, cv2.boundingRect(c)) for c in top_contours]
+    return dims, crops
@@ -1,8 +1,11 @@
+from concurrent.futures import ThreadPoolExecutor
 from scipy.spatial import distance as dist
+from scipy.optimize import linear_sum_assignment
 from imutils import perspective
 import numpy as np
 import imutils
 import cv2
+import os
 from PIL import Image
 
 def midpoint(ptA, ptB):
@@ -38,6 +41,37 @@ def get_3d_dimensions(top_dims, front_dims):
                 return tuple(sorted([top_dims[0], top_dims[1], front_dims[0] if f_dim == front_dims[1] else front_dims[1]]))
     return None
 
+# Real-world dimensions are snapped to this many decimals of a cm (0.1 mm),
+# the fixed-point unit the packing engines work in.
+DIMENSION_DECIMALS = 2
+
+def get_3d_dimensions_batch(top_dims, front_dims):
+    """
+    Vectorized get_3d_dimensions for many objects at once.
+
+    Args:
+        top_dims (numpy.ndarray): (n, 2) dimensions from the top-down view.
+        front_dims (numpy.ndarray): (n, 2) dimensions from the front view, row-aligned with top_dims.
+
+    Returns:
+        numpy.ndarray: (n, 3) sorted 3D dimensions, NaN rows where the views do not match.
+    """
+    top = np.asarray(top_dims, dtype=float).reshape(-1, 2)
+    front = np.asarray(front_dims, dtype=float).reshape(-1, 2)
+    n = len(top)
+
+    # ok[i, k, j]: front dim j is within tolerance of the top-view length, using top dim k for the tolerance;
+    # get_3d_dimensions takes the first match in (k, j) order
+    ok = np.abs(top[:, None, 0:1] - front[:, None, :]) < 0.2 * top[:, :, None]
+    ok = ok.reshape(n, 4)
+    first = np.argmax(ok, axis=1)
+    matched = front[np.arange(n), first % 2]
+    other = np.where(matched == front[:, 1], front[:, 0], front[:, 1])
+
+    dims = np.sort(np.column_stack([top, other]), axis=1)
+    dims[~ok.any(axis=1)] = np.nan
+    return dims
+
 def get_real_dimensions(reference_img_dims, object_dims, input_dims):
     """
     Calculate real-world dimensions using normalized dimensions.
@@ -48,60 +82,270 @@ def get_real_dimensions(reference_img_dims, object_dims, input_dims):
         input_dims (tuple): Real-world dimensions of the reference object.
 
     Returns:
-        tuple: Real-world dimensions of the object.
+        tuple: Real-world dimensions of the object, rounded to 0.1 mm.
     """
     scale_factors = [input_dims[i] / reference_img_dims[i] for i in range(3)]
-    return tuple(scale_factors[i] * object_dims[i] for i in range(3))
+    return tuple(round(scale_factors[i] * object_dims[i], DIMENSION_DECIMALS) for i in range(3))
 
-def get_dims(image):
+def get_all_real_dimensions(reference_img_dims, object_dims, input_dims):
     """
-    Extract dimensions of the two largest objects in the image.
+    Vectorized get_real_dimensions for a table of objects measured against one reference.
 
     Args:
-        image (numpy.ndarray): Input image.
+        reference_img_dims (tuple): Dimensions of the reference object in pixels.
+        object_dims (numpy.ndarray): (n, 3) dimensions of the measured objects in pixels.
+        input_dims (tuple): Real-world dimensions of the reference object.
 
     Returns:
-        list: List of tuples containing dimensions and centroid x-coordinate.
+        numpy.ndarray: (n, 3) real-world dimensions, rounded to 0.1 mm.
     """
-    dims = []
-    grey = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    blurred = cv2.GaussianBlur(grey, (25, 25), 0)
-    illumination_corrected = cv2.divide(grey, blurred, scale=255)
-    illumination_corrected = cv2.GaussianBlur(illumination_corrected, (7, 7), 0)
+    scale_factors = np.asarray(input_dims, dtype=float) / np.asarray(reference_img_dims, dtype=float)
+    return np.round(np.asarray(object_dims, dtype=float) * scale_factors, DIMENSION_DECIMALS)
+
+# Long side, in pixels, of the copy contours are detected on in pyramid mode
+PYRAMID_MAX_SIDE = 1024
+
+# Number of largest contours refined at full resolution in pyramid mode, a few more than
+# the two get_dims uses, since ranking on the downscaled copy is less reliable
+PYRAMID_REFINE = 4
+
+# Extra full-resolution pixels around each refined box, enough for the blurs
+# to see the same neighbourhood as on the whole image
+PYRAMID_MARGIN = 24
+
+# Contours smaller than this share of the photo are noise rather than objects in multi-object mode
+MIN_OBJECT_FRACTION = 0.002
 
-    edged = cv2.Canny(illumination_corrected, 50, 100)
+# Above this share of the photo, refining regions costs more than detecting on the whole photo
+PYRAMID_MAX_COVERAGE = 0.5
+
+def _odd(size):
+    return max(int(size) // 2 * 2 + 1, 3)
+
+def find_contours(grey, scale=1.0, mode=cv2.RETR_EXTERNAL):
+    """
+    Illumination-correct a grayscale image and find its external contours, largest first.
+
+    Args:
+        grey (numpy.ndarray): Grayscale image.
+        scale (float): How many times smaller grey is than the full-resolution photo;
+            blur kernels shrink with it.
+        mode (int): cv2.findContours retrieval mode, e.g. cv2.RETR_LIST to include inner contours.
+
+    Returns:
+        tuple: The illumination-corrected image and the contours.
+    """
+    blurred = cv2.GaussianBlur(grey, (_odd(25 / scale), _odd(25 / scale)), 0)
+    corrected = cv2.divide(grey, blurred, scale=255)
+    corrected = cv2.GaussianBlur(corrected, (_odd(7 / scale), _odd(7 / scale)), 0)
+
+    edged = cv2.Canny(corrected, 50, 100)
     edged = cv2.dilate(edged, None, iterations=1)
     edged = cv2.erode(edged, None, iterations=1)
 
-    cnts = cv2.findContours(edged, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    cnts = cv2.findContours(edged, mode, cv2.CHAIN_APPROX_SIMPLE)
     cnts = imutils.grab_contours(cnts)
-    cnts = sorted(cnts, key=cv2.contourArea, reverse=True)[:2]
+    return corrected, sorted(cnts, key=cv2.contourArea, reverse=True)
+
+def _regions(contours, scale, shape):
+    """
+    Padded full-resolution bounding boxes of downscaled contours, with overlapping boxes merged.
 
+    Args:
+        contours (list): Contours in downscaled coordinates.
+        scale (float): Downscale factor of the copy the contours were found on.
+        shape (tuple): Full-resolution image shape.
+
+    Returns:
+        list: (x0, y0, x1, y1) regions.
+    """
+    pad = PYRAMID_MARGIN + int(np.ceil(scale))
+    boxes = []
+    for c in contours:
+        x, y, w, h = cv2.boundingRect(c)
+        boxes.append([
+            max(int(x * scale) - pad, 0), max(int(y * scale) - pad, 0),
+            min(int(np.ceil((x + w) * scale)) + pad, shape[1]), min(int(np.ceil((y + h) * scale)) + pad, shape[0]),
+        ])
+
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                a, b = boxes[i], boxes[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    boxes[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    del boxes[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return boxes
+
+def _refine(grey, region):
+    """
+    Redetect contours at full resolution inside a region found on a downscaled copy.
+
+    Objects that merged into one contour on the downscaled copy come out as
+    separate contours here.
+
+    Args:
+        grey (numpy.ndarray): Full-resolution grayscale image.
+        region (tuple): (x0, y0, x1, y1) region from _regions.
+
+    Returns:
+        list: Contours inside the region, in full-resolution coordinates.
+    """
+    x0, y0, x1, y1 = region
+    _, cnts = find_contours(grey[y0:y1, x0:x1])
+    refined = []
     for c in cnts:
-        box = cv2.minAreaRect(c)
-        box = cv2.boxPoints(box) if imutils.is_cv3() else cv2.boxPoints(box)
-        box = perspective.order_points(box)
+        cx, cy, cw, ch = cv2.boundingRect(c)
+        # Contours cut off by the region, rather than by the photo, belong to a neighbouring object
+        if (cx == 0 and x0 > 0) or (cy == 0 and y0 > 0) or \
+                (cx + cw == x1 - x0 and x1 < grey.shape[1]) or (cy + ch == y1 - y0 and y1 < grey.shape[0]):
+            continue
+        refined.append(c + np.array([x0, y0], dtype=c.dtype))
+    return refined
+
+def object_contours(contours, shape):
+    """
+    Contours that are objects rather than noise, for multi-object mode.
+
+    Drops contours below MIN_OBJECT_FRACTION of the photo, and strips spanning
+    its whole width or height, which are table or backdrop edges.
+    """
+    objects = []
+    for c in contours:
+        _, _, w, h = cv2.boundingRect(c)
+        if cv2.contourArea(c) >= MIN_OBJECT_FRACTION * shape[0] * shape[1] and w < 0.95 * shape[1] and h < 0.95 * shape[0]:
+            objects.append(c)
+    return objects
+
+def preprocess(image, max_side=None, refine=PYRAMID_REFINE):
+    """
+    Run the shared preprocessing of a photo once, for cropping, measuring and labeling.
+
+    With max_side set, larger photos go through pyramid mode: contours are
+    detected and ranked on a copy downscaled to max_side pixels on its long
+    side, and only the refine largest are redetected at full resolution
+    inside their bounding boxes, so pixel measurements keep their accuracy.
+
+    Args:
+        image (numpy.ndarray): Input BGR image.
+        max_side (int, optional): Enable pyramid mode for photos larger than this,
+            e.g. PYRAMID_MAX_SIDE.
+        refine (int, optional): Number of contours to refine in pyramid mode,
+            or None for every object in multi-object mode.
+
+    Returns:
+        dict: The input "image", its "grey" version, the "corrected"
+        (illumination-corrected) image, its external "contours", largest
+        first, and the "scale" the contours were detected at. In pyramid mode
+        "corrected" is the downscaled copy and "contours" only holds the
+        refined ones.
+    """
+    grey = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    scale = max(grey.shape) / max_side if max_side else 1.0
+    if scale <= 1.0:
+        corrected, cnts = find_contours(grey)
+        return {"image": image, "grey": grey, "corrected": corrected, "contours": cnts, "scale": 1.0}
+
+    small = cv2.resize(grey, None, fx=1 / scale, fy=1 / scale, interpolation=cv2.INTER_AREA)
+    corrected, cnts = find_contours(small, scale)
+    chosen = object_contours(cnts, small.shape) if refine is None else cnts[:refine]
+    regions = _regions(chosen, scale, grey.shape)
+    if sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in regions) > PYRAMID_MAX_COVERAGE * grey.size:
+        _, cnts = find_contours(grey)
+        return {"image": image, "grey": grey, "corrected": corrected, "contours": cnts, "scale": scale}
+
+    refined = []
+    for region in regions:
+        refined.extend(_refine(grey, region))
+    cnts = sorted(refined, key=cv2.contourArea, reverse=True)
+    return {"image": image, "grey": grey, "corrected": corrected, "contours": cnts, "scale": scale}
+
+def _preprocessed(image):
+    """Accept either a raw image or the output of preprocess."""
+    return image if isinstance(image, dict) else preprocess(image)
+
+# Fields of the record array returned by get_dims: each box's extent between the midpoints
+# of its top and bottom (dA) and left and right (dB) edges, its contour's centroid x,
+# the contour's bounding rectangle (x, y, w, h) and the box's corners (tl, tr, br, bl)
+BOX_DTYPE = np.dtype([
+    ("dA", np.float64),
+    ("dB", np.float64),
+    ("cX", np.int64),
+    ("rect", np.int32, (4,)),
+    ("corners", np.float32, (4, 2)),
+])
+
+def measure_contours(contours):
+    """
+    Measure the minimum area box of each contour.
 
-        (tl, tr, br, bl) = box
-        (tltrX, tltrY) = midpoint(tl, tr)
-        (blbrX, blbrY) = midpoint(bl, br)
-        (tlblX, tlblY) = midpoint(tl, bl)
-        (trbrX, trbrY) = midpoint(tr, br)
+    Args:
+        contours (list): Contours, e.g. from preprocess.
 
-        dA = dist.euclidean((tltrX, tltrY), (blbrX, blbrY))
-        dB = dist.euclidean((tlblX, tlblY), (trbrX, trbrY))
+    Returns:
+        numpy.recarray: One BOX_DTYPE record per contour, sorted by centroid x.
+    """
+    boxes = np.zeros(len(contours), dtype=BOX_DTYPE)
+    for i, c in enumerate(contours):
+        (tl, tr, br, bl) = corners = perspective.order_points(cv2.boxPoints(cv2.minAreaRect(c)))
+        boxes["dA"][i] = dist.euclidean(midpoint(tl, tr), midpoint(bl, br))
+        boxes["dB"][i] = dist.euclidean(midpoint(tl, bl), midpoint(tr, br))
 
         M = cv2.moments(c)
-        cX = int(M["m10"] / M["m00"] if M["m00"] != 0 else 0)
-        dims.append((dA, dB, cX))
+        boxes["cX"][i] = int(M["m10"] / M["m00"] if M["m00"] != 0 else 0)
+        boxes["rect"][i] = cv2.boundingRect(c)
+        boxes["corners"][i] = corners
+
+    # Sort by x-coordinate of the centroid
+    return boxes[np.argsort(boxes["cX"], kind="stable")].view(np.recarray)
+
+def get_dims(image, count=2):
+    """
+    Extract dimensions of the largest objects in the image.
+
+    The image is only read, so it can be shared with labeling or other
+    threads; draw the results with annotate if needed.
+
+    Args:
+        image (numpy.ndarray or dict): Input image, or its preprocess output.
+        count (int, optional): Number of objects to measure, largest first, or
+            None for every contour covering at least MIN_OBJECT_FRACTION of the image.
+
+    Returns:
+        numpy.recarray: BOX_DTYPE records with the dimensions dA and dB and the
+        centroid x-coordinate cX of each object, sorted by cX.
+    """
+    prep = _preprocessed(image)
+    if count is None:
+        cnts = object_contours(prep["contours"], prep["image"].shape)
+    else:
+        cnts = prep["contours"][:count]
+    return measure_contours(cnts)
+
+def annotate(image, boxes):
+    """
+    Draw measured boxes and their pixel dimensions on a copy of the image.
 
-        # Draw the bounding box on the original image
-        cv2.drawContours(image, [box.astype("int")], -1, (0, 255, 0), 2)
+    Args:
+        image (numpy.ndarray): BGR image the boxes were measured on.
+        boxes (numpy.recarray): Output of get_dims or measure_contours.
 
-        # Optional: Annotate dimensions
+    Returns:
+        numpy.ndarray: The annotated copy.
+    """
+    image = image.copy()
+    for box in boxes:
+        (tl, tr, br, bl) = box["corners"]
+        cv2.drawContours(image, [box["corners"].astype("int")], -1, (0, 255, 0), 2)
         cv2.putText(
             image,
-            f"{dA:.1f}px",
+            f"{box['dA']:.1f}px",
             (int(tl[0]), int(tl[1] - 10)),
             cv2.FONT_HERSHEY_SIMPLEX,
             0.5,
@@ -110,69 +354,139 @@ def get_dims(image):
         )
         cv2.putText(
             image,
-            f"{dB:.1f}px",
+            f"{box['dB']:.1f}px",
             (int(tr[0] + 10), int(tr[1])),
             cv2.FONT_HERSHEY_SIMPLEX,
             0.5,
             (255, 255, 255),
             1,
         )
+    return image
 
-        # Show the image with bounding boxes
-        # Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB)).show()
-
-
-    dims.sort(key=lambda x: x[2])  # Sort by x-coordinate of the centroid
-    return dims
+def _dims(boxes, i):
+    """(dA, dB) of one measured box, as plain floats."""
+    return float(boxes["dA"][i]), float(boxes["dB"][i])
 
 def get_objects(im_td, im_side):
     """
     Calculate 3D dimensions of objects using top-down and side view images.
 
     Args:
-        im_td (numpy.ndarray): Top-down view image.
-        im_side (numpy.ndarray): Side view image.
+        im_td (numpy.ndarray or dict): Top-down view image, or its preprocess output.
+        im_side (numpy.ndarray or dict): Side view image, or its preprocess output.
 
     Returns:
         tuple: Dimensions of the reference and the measured object.
     """
     td_dims = get_dims(im_td)
     side_dims = get_dims(im_side)
+    if len(td_dims) < 2 or len(side_dims) < 2:
+        raise ValueError(
+            f"Expected the object and the reference in both views, found {len(td_dims)} object(s) in the "
+            f"top view and {len(side_dims)} in the front view."
+        )
 
-    reference_td = td_dims[1]  # Rightmost object in top-down view
-    object_td = td_dims[0]
+    reference_td = _dims(td_dims, 1)  # Rightmost object in top-down view
+    object_td = _dims(td_dims, 0)
 
-    reference_side = side_dims[1]  # Rightmost object in side view
-    object_side = side_dims[0]
+    reference_side = _dims(side_dims, 1)  # Rightmost object in side view
+    object_side = _dims(side_dims, 0)
 
-    reference_dims = get_3d_dimensions(reference_td[:2], reference_side[:2])
-    object_dims = get_3d_dimensions(object_td[:2], object_side[:2])
+    reference_dims = get_3d_dimensions(reference_td, reference_side)
+    object_dims = get_3d_dimensions(object_td, object_side)
 
     return reference_dims, object_dims
 
+def _relative_x(boxes):
+    """Centroid x of each object relative to the leftmost object (0) and the reference (1)."""
+    x = boxes["cX"].astype(float)
+    span = x[-1] - x[0]
+    return (x - x[0]) / span if span else np.zeros_like(x)
+
+def match_views(top_dims, front_dims, top_x, front_x):
+    """
+    Match objects between the top-down and front views and compute their 3D dimensions.
+
+    Pairs whose dimensions agree come first, then the closest by position.
+
+    Args:
+        top_dims (list): (dA, dB) of each object in the top-down view.
+        front_dims (list): (dA, dB) of each object in the front view.
+        top_x (numpy.ndarray): Position of each top-view object along the shared horizontal axis.
+        front_x (numpy.ndarray): Position of each front-view object, on the same scale, e.g. in cm.
+
+    Returns:
+        numpy.ndarray: (n, 3) dimensions per top-view object, NaN rows where no match was found.
+    """
+    top = np.asarray(top_dims, dtype=float).reshape(-1, 2)
+    front = np.asarray(front_dims, dtype=float).reshape(-1, 2)
+    object_dims = np.full((len(top), 3), np.nan)
+    if not len(top) or not len(front):
+        return object_dims
+
+    candidates = get_3d_dimensions_batch(np.repeat(top, len(front), axis=0), np.tile(front, (len(top), 1)))
+    mismatch = np.isnan(candidates[:, 0]).reshape(len(top), len(front))
+    distance = np.abs(np.asarray(top_x, dtype=float)[:, None] - np.asarray(front_x, dtype=float)[None, :])
+    # Outweigh any difference in position, whatever the scale of the positions
+    rows, cols = linear_sum_assignment(distance + (1.0 + distance.max()) * mismatch)
+    object_dims[rows] = candidates.reshape(len(top), len(front), 3)[rows, cols]
+    return object_dims
+
+def get_all_objects(im_td, im_side):
+    """
+    Calculate 3D dimensions of every object in a top-down and side view photo pair.
+
+    The rightmost object in each view is the reference, as in get_objects.
+    The other objects are matched between the views by their position
+    relative to the leftmost object and the reference, and all 3D dimensions
+    are computed in one vectorized step.
+
+    Args:
+        im_td (numpy.ndarray or dict): Top-down view image, or its preprocess output
+            with refine=None in pyramid mode.
+        im_side (numpy.ndarray or dict): Side view image, or its preprocess output.
+
+    Returns:
+        tuple: Dimensions of the reference, an (n, 3) array of dimensions of the
+        measured objects from left to right (NaN rows where the views do not match),
+        and each object's (x, y, w, h) bounding rectangle in the top-down view.
+    """
+    td_dims = get_dims(im_td, count=None)
+    side_dims = get_dims(im_side, count=None)
+    if len(td_dims) < 2 or len(side_dims) < 2:
+        raise ValueError(
+            f"Expected at least one object and the reference in both views, found {len(td_dims)} object(s) in the "
+            f"top view and {len(side_dims)} in the front view."
+        )
+
+    reference_dims = get_3d_dimensions(_dims(td_dims, -1), _dims(side_dims, -1))
+
+    # Match objects between the views, excluding the reference
+    object_dims = match_views(
+        np.column_stack([td_dims.dA, td_dims.dB])[:-1], np.column_stack([side_dims.dA, side_dims.dB])[:-1],
+        _relative_x(td_dims)[:-1], _relative_x(side_dims)[:-1],
+    )
+    return reference_dims, object_dims, [tuple(rect) for rect in td_dims.rect[:-1].tolist()]
+
 def crop_to_object(im):
     """
-    Calculate 3D dimensions of objects using top-down and side view images.
-    Assuming that the leftmost object in the top-down view is the object we want to label.
+    Crop the top-down view to the object to label.
+    Assuming that the leftmost of the two largest objects in the top-down view is the object we want to label,
+    as in get_objects.
 
     Args:
-        im_td (numpy.ndarray): Top-down view image.
+        im (numpy.ndarray or dict): Top-down view image, or its preprocess output.
 
     Returns:
-        tuple: Dimensions of the reference and the measured object.
+        numpy.ndarray: The image cropped to the object's bounding box.
     """
-    # Convert the image to grayscale
-    gray = cv2.cvtColor(im, cv2.COLOR_BGR2GRAY)
-    
-    # Blur and threshold to detect contours
-    blurred = cv2.GaussianBlur(gray, (15, 15), 0)
-    _, thresh = cv2.threshold(blurred, 50, 255, cv2.THRESH_BINARY)
-    
-    # Find contours
-    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    
+    prep = _preprocessed(im)
+    im = prep["image"]
+    if not prep["contours"]:
+        return im
+
     # Sort contours by x-coordinate (leftmost contour will be the object of interest)
-    contours = sorted(contours, key=lambda c: cv2.boundingRect(c)[0])
+    contours = sorted(prep["contours"][:2], key=lambda c: cv2.boundingRect(c)[0])
 
     x, y, w, h = cv2.boundingRect(contours[0])
     cropped_im = im[y:y+h, x:x+w]
@@ -181,6 +495,117 @@ def crop_to_object(im):
     return cropped_im
 
 
+_pool = None
+_pool_workers = 0
+
+def get_pool(workers):
+    """
+    Shared thread pool for measuring photos concurrently, reused across Streamlit reruns.
+
+    OpenCV releases the GIL, so the threads run in parallel.
+
+    Args:
+        workers (int): Number of threads; a different count replaces the pool.
+
+    Returns:
+        concurrent.futures.ThreadPoolExecutor: The pool.
+    """
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = ThreadPoolExecutor(max_workers=workers)
+        _pool_workers = workers
+    return _pool
+
+def decode_image(data):
+    """
+    Decode an uploaded photo.
+
+    Args:
+        data (bytes): Encoded image file contents.
+
+    Returns:
+        numpy.ndarray: BGR image.
+    """
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Could not decode the image.")
+    return image
+
+def measure_pair(im_td, im_side, max_side=None, multi=False):
+    """
+    Crop and measure one item from its top-down and side view photos.
+
+    Args:
+        im_td (numpy.ndarray or bytes): Top-down view image, or its encoded file contents.
+        im_side (numpy.ndarray or bytes): Side view image, or its encoded file contents.
+        max_side (int, optional): Pyramid mode setting passed to preprocess.
+        multi (bool, optional): Measure every object next to the reference with get_all_objects.
+
+    Returns:
+        dict: The decoded "image_top" and "image_front", the "crop" of the object
+        and the pixel dimensions "ref_px" and "obj_px" as returned by get_objects.
+        With multi, "crops" holds one crop per object instead and "obj_px" is
+        the (n, 3) array returned by get_all_objects.
+    """
+    image_top = decode_image(im_td) if isinstance(im_td, bytes) else im_td
+    image_front = decode_image(im_side) if isinstance(im_side, bytes) else im_side
+    refine = None if multi else PYRAMID_REFINE
+    prep_top = preprocess(image_top, max_side=max_side, refine=refine)
+    prep_front = preprocess(image_front, max_side=max_side, refine=refine)
+
+    # Measuring leaves the photos untouched, so the crops are views into them
+    if multi:
+        ref_px, obj_px, boxes = get_all_objects(prep_top, prep_front)
+        if ref_px is None:
+            raise ValueError("Could not match the top and front views of the reference.")
+        crops = [image_top[y:y + h, x:x + w] for x, y, w, h in boxes]
+        return {"image_top": image_top, "image_front": image_front, "crops": crops, "ref_px": ref_px, "obj_px": obj_px}
+
+    crop = crop_to_object(prep_top)
+    ref_px, obj_px = get_objects(prep_top, prep_front)
+    if ref_px is None or obj_px is None:
+        raise ValueError("Could not match the top and front views of the object and the reference.")
+    return {"image_top": image_top, "image_front": image_front, "crop": crop, "ref_px": ref_px, "obj_px": obj_px}
+
+def _measure_or_error(im_td, im_side, max_side, multi=False):
+    try:
+        return {**measure_pair(im_td, im_side, max_side, multi), "error": None}
+    except ValueError as e:
+        return {"error": str(e)}
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+def measure_batch(top_images, front_images, max_side=None, workers=None, multi=False):
+    """
+    Measure many items concurrently, one top-down and side view pair each.
+
+    Pairs are measured on a thread pool. A pair that fails, e.g. because a
+    photo shows only one object, gets an "error" message instead of raising,
+    so the rest of the batch is still measured.
+
+    Args:
+        top_images (list): Top-down view images, or their encoded file contents.
+        front_images (list): Side view images, in the same order.
+        max_side (int, optional): Pyramid mode setting passed to preprocess.
+        workers (int, optional): Number of threads, defaults to the CPU count.
+        multi (bool, optional): Measure every object in each pair, see measure_pair.
+
+    Returns:
+        list: One measure_pair dict per pair, in input order, each with an
+        "error" key that is None on success.
+    """
+    if len(top_images) != len(front_images):
+        raise ValueError("The number of top view and front view images must match.")
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(top_images) < 2:
+        return [_measure_or_error(t, f, max_side, multi) for t, f in zip(top_images, front_images)]
+    pool = get_pool(workers)
+    n = len(top_images)
+    return list(pool.map(_measure_or_error, top_images, front_images, [max_side] * n, [multi] * n))
+
+
 if __name__ == "__main__":
     image_top = cv2.imread("/Users/suraj/Downloads/bloody-dotslash-clowns/assets/megaminx_top.jpeg")
     image_front = cv2.imread("/Users/suraj/Downloads/bloody-dotslash-clowns/assets/megaminx_front.jpeg")
@@ -194,4 +619,4 @@ if __name__ == "__main__":
 
     # print(f"Reference dims (real-world): {real_reference_dims} cm")
     # print(f"Object dims (real-world): {real_obj_dims} cm")
-    crop_to_object(image_top, image_front)
+    crop_to_object(preprocess(image_top))
@@ -0,0 +1,139 @@
+import os
+
+import cv2
+import numpy as np
+
+import detect_objects as dobj
+
+# Inner contours covering less than this share of the shelf's outline are doors, labels or noise
+MIN_CAVITY_FRACTION = 0.2
+
+# Inner contours covering more than this share of the shelf's outline are the outline itself
+MAX_CAVITY_FRACTION = 0.9
+
+
+def _extent(contour):
+    """Vertical and horizontal pixel extent (dA, dB) of a contour, as measured by detect_objects.get_dims."""
+    box = dobj.measure_contours([contour])
+    return float(box.dA[0]), float(box.dB[0])
+
+
+def find_cavity(grey, shelf):
+    """
+    Find the inner opening of a shelf inside its outline.
+
+    The shelf's bounding box is searched again with every contour retrieved,
+    not only external ones, using the same illumination correction and edge
+    detection as detect_objects.preprocess.
+
+    Args:
+        grey (numpy.ndarray): Full-resolution grayscale photo.
+        shelf (numpy.ndarray): Outer contour of the shelf.
+
+    Returns:
+        numpy.ndarray: The cavity contour in photo coordinates, or None if the view shows none.
+    """
+    x, y, w, h = cv2.boundingRect(shelf)
+    pad = dobj.PYRAMID_MARGIN
+    x0, y0 = max(x - pad, 0), max(y - pad, 0)
+    x1, y1 = min(x + w + pad, grey.shape[1]), min(y + h + pad, grey.shape[0])
+    _, cnts = dobj.find_contours(grey[y0:y1, x0:x1], mode=cv2.RETR_LIST)
+
+    for c in cnts:
+        _, _, cw, ch = cv2.boundingRect(c)
+        share = cw * ch / (w * h)
+        if share > MAX_CAVITY_FRACTION:
+            continue
+        if share < MIN_CAVITY_FRACTION:
+            # Contours come largest first, so the rest are smaller still
+            break
+        return c + np.array([x0, y0], dtype=c.dtype)
+    return None
+
+
+def _shelf_view(image, max_side=None):
+    """
+    Pixel extents of the reference, the shelf and its cavity in one view.
+
+    The reference is the rightmost object, as in detect_objects.get_objects,
+    and the shelf is the largest of the others.
+    """
+    prep = image if isinstance(image, dict) else dobj.preprocess(image, max_side, refine=None)
+    cnts = dobj.object_contours(prep["contours"], prep["image"].shape)
+    if len(cnts) < 2:
+        raise ValueError(f"Expected a shelf and the reference, found {len(cnts)} object(s).")
+
+    centres = [cv2.boundingRect(c)[0] + cv2.boundingRect(c)[2] / 2 for c in cnts]
+    reference = cnts[int(np.argmax(centres))]
+    shelf = max((c for c in cnts if c is not reference), key=cv2.contourArea)
+    cavity = find_cavity(prep["grey"], shelf)
+    return {
+        "reference": _extent(reference),
+        "shelf": _extent(shelf),
+        "cavity": _extent(cavity) if cavity is not None else None,
+    }
+
+
+def get_shelf_dims(im_td, im_side, ref_real, max_side=None):
+    """
+    Measure the inside of a shelf from its top-down and front view photos.
+
+    The front view gives the width and height of the opening, the top-down
+    view the depth. Where a view shows no cavity, e.g. a closed top, the
+    shelf's outline is used instead.
+
+    Args:
+        im_td (numpy.ndarray or dict): Top-down view image, or its preprocess output.
+        im_side (numpy.ndarray or dict): Front view image, or its preprocess output.
+        ref_real (tuple): Real-world (width, length, height) of the reference object.
+        max_side (int, optional): Pyramid mode setting passed to detect_objects.preprocess.
+
+    Returns:
+        list: Inner (width, height, depth) in cm, in the order Bin and the packing engines take.
+    """
+    ref_width, ref_length, ref_height = ref_real
+    top = _shelf_view(im_td, max_side)
+    front = _shelf_view(im_side, max_side)
+
+    front_dA, front_dB = front["cavity"] or front["shelf"]
+    top_dA, _ = top["cavity"] or top["shelf"]
+    width = front_dB * ref_width / front["reference"][1]
+    height = front_dA * ref_height / front["reference"][0]
+    depth = top_dA * ref_length / top["reference"][0]
+    return [round(float(d), dobj.DIMENSION_DECIMALS) for d in (width, height, depth)]
+
+
+def _shelf_or_error(im_td, im_side, ref_real, max_side):
+    try:
+        im_td = dobj.decode_image(im_td) if isinstance(im_td, bytes) else im_td
+        im_side = dobj.decode_image(im_side) if isinstance(im_side, bytes) else im_side
+        return {"dimensions": get_shelf_dims(im_td, im_side, ref_real, max_side), "error": None}
+    except ValueError as e:
+        return {"dimensions": None, "error": str(e)}
+    except Exception as e:
+        return {"dimensions": None, "error": f"{type(e).__name__}: {e}"}
+
+
+def measure_shelves(top_images, front_images, ref_real, max_side=None, workers=None):
+    """
+    Measure many shelves concurrently, one top-down and front view pair each.
+
+    Args:
+        top_images (list): Top-down view images, or their encoded file contents.
+        front_images (list): Front view images, in the same order.
+        ref_real (tuple): Real-world (width, length, height) of the reference object in every photo.
+        max_side (int, optional): Pyramid mode setting passed to detect_objects.preprocess.
+        workers (int, optional): Number of threads, defaults to the CPU count.
+
+    Returns:
+        list: Per shelf, in input order, a dict with the "dimensions" from
+        get_shelf_dims and an "error" message that is None on success.
+    """
+    if len(top_images) != len(front_images):
+        raise ValueError("The number of top view and front view images for shelves must match.")
+    n = len(top_images)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or n < 2:
+        return [_shelf_or_error(t, f, ref_real, max_side) for t, f in zip(top_images, front_images)]
+    pool = dobj.get_pool(workers)
+    return list(pool.map(_shelf_or_error, top_images, front_images, [ref_real] * n, [max_side] * n))
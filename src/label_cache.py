@@ -0,0 +1,153 @@
+import os
+import json
+import tempfile
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+# Bits of a dHash: 8 rows of 8 horizontal gradients
+HASH_BITS = 64
+
+
+def dhash(image):
+    """
+    Difference hash of an image, robust to rescaling, recompression and small lighting changes.
+
+    Args:
+        image (numpy.ndarray): BGR or grayscale image, e.g. a crop from detect_objects.crop_to_object.
+
+    Returns:
+        int: 64-bit hash, one bit per horizontal brightness gradient of a 9x8 thumbnail.
+    """
+    grey = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(grey, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class LabelCache:
+    """
+    Bounded LRU cache of labels keyed by perceptual hash, so re-photographed items skip the model.
+
+    Lookups return the nearest stored hash within max_distance bits. They use
+    multi-index hashing: each hash is split into max_distance + 1 chunks, and
+    by the pigeonhole principle any hash within max_distance bits matches at
+    least one chunk exactly, so only hashes sharing a chunk are compared. If
+    a path is given, the cache is saved there as JSON after every batch and
+    loaded back after a restart.
+    """
+
+    def __init__(self, max_entries=4096, max_distance=6, path=None):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Bit ranges of the chunks, as even as HASH_BITS allows
+        edges = np.linspace(0, HASH_BITS, max_distance + 2).astype(int)
+        self._chunks = [(int(lo), int(hi - lo)) for lo, hi in zip(edges[:-1], edges[1:])]
+        self._index = [{} for _ in self._chunks]
+
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    entries = json.load(f)
+            except (OSError, ValueError):
+                # A damaged cache file is rebuilt from scratch rather than failing startup
+                entries = []
+            for key, (label, confidence) in entries:
+                self._put(int(key, 16), label, confidence)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _parts(self, key):
+        return [(key >> lo) & ((1 << width) - 1) for lo, width in self._chunks]
+
+    def _put(self, key, label, confidence):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        else:
+            for index, part in zip(self._index, self._parts(key)):
+                index.setdefault(part, set()).add(key)
+        self._entries[key] = (label, confidence)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            for index, part in zip(self._index, self._parts(evicted)):
+                index[part].discard(evicted)
+                if not index[part]:
+                    del index[part]
+
+    def _nearest(self, key):
+        candidates = set()
+        for index, part in zip(self._index, self._parts(key)):
+            candidates |= index.get(part, set())
+        best, best_distance = None, self.max_distance + 1
+        for candidate in candidates:
+            distance = hamming(key, candidate)
+            if distance < best_distance:
+                best, best_distance = candidate, distance
+        return best
+
+    def get(self, key):
+        """(label, confidence) of the nearest stored hash within max_distance, counting the hit or miss."""
+        with self._lock:
+            nearest = self._nearest(key)
+            if nearest is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(nearest)
+            self.hits += 1
+            return self._entries[nearest]
+
+    def put(self, key, label, confidence):
+        with self._lock:
+            self._put(key, label, confidence)
+
+    def save(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            entries = [(f"{key:016x}", list(value)) for key, value in self._entries.items()]
+            # A temporary file per save, so a concurrent save never replaces the file with a partial one
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(entries, f)
+                os.replace(tmp, self.path)
+            except Exception:
+                os.remove(tmp)
+                raise
+
+    def label(self, images, label_fn):
+        """
+        Label images, running label_fn only on those without a near-duplicate in the cache.
+
+        Args:
+            images (list): BGR crops.
+            label_fn (callable): Labels a list of images, returning (label, confidence)
+                pairs, e.g. object_labeling.label_cascade.
+
+        Returns:
+            list: (label, confidence) per image, in input order.
+        """
+        keys = [dhash(image) for image in images]
+        results = [self.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            for i, (label, confidence) in zip(missing, label_fn([images[i] for i in missing])):
+                results[i] = (label, confidence)
+                self.put(keys[i], label, confidence)
+            self.save()
+        return results
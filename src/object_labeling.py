@@ -1,40 +1,272 @@
-from transformers import ViTForImageClassification, ViTImageProcessor
+import os
+import time
+import threading
+
 from PIL import Image
-import torch
 import cv2
 import numpy as np
 
-# Load the pre-trained ViT model and processor
-model_name = "google/vit-base-patch16-224"
-model = ViTForImageClassification.from_pretrained(model_name)
-processor = ViTImageProcessor.from_pretrained(model_name)
+# Pre-trained ViT model used for labeling
+MODEL_NAME = "google/vit-base-patch16-224"
 
-# Function to label an image
-def label_image(image_input):
+# ViT-Tiny trained on the same ImageNet-1k labels, about 15 times cheaper, for the first stage of label_cascade
+SMALL_MODEL_NAME = "WinKawaks/vit-tiny-patch16-224"
+
+# Crops the small model labels with a lower top-1 confidence are escalated to MODEL_NAME;
+# 0 never escalates, above 1 always does. Set with the LABEL_CASCADE_THRESHOLD environment variable.
+CASCADE_THRESHOLD = float(os.environ.get("LABEL_CASCADE_THRESHOLD", "0.5"))
+
+# CPU inference backends: "fp32" runs the model as loaded, "int8" with dynamically quantized
+# Linear layers, "torchscript" a traced and frozen graph, and "onnx" an exported graph in
+# onnxruntime, an optional dependency. Select one with the LABEL_BACKEND environment variable.
+BACKENDS = ("fp32", "int8", "torchscript", "onnx")
+BACKEND = os.environ.get("LABEL_BACKEND", "fp32")
+
+# Exported ONNX graphs, reused across restarts
+ONNX_DIR = os.environ.get("LABEL_ONNX_DIR", os.path.join(os.path.dirname(__file__), "..", ".cache", "onnx"))
+
+# Process-wide registry of loaded models, so every Streamlit session and rerun shares one copy
+_models = {}
+_loading = {}
+_lock = threading.Lock()
+
+
+def _load(model_name, backend):
+    """
+    Load a model for one backend.
+
+    Returns:
+        tuple: A predict function from a batch of pixel values to logits,
+        the image processor, and the model's id2label mapping.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown labeling backend {backend!r}, expected one of {BACKENDS}.")
+
+    # torch and transformers are imported here, so importing this module stays cheap
+    import torch
+    from transformers import ViTForImageClassification, ViTImageProcessor
+
+    model = ViTForImageClassification.from_pretrained(model_name)
+    model.eval()
+    processor = ViTImageProcessor.from_pretrained(model_name)
+    id2label = model.config.id2label
+
+    if backend == "fp32":
+        return (lambda pixel_values: model(pixel_values=pixel_values).logits), processor, id2label
+    if backend == "int8":
+        quantized = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return (lambda pixel_values: quantized(pixel_values=pixel_values).logits), processor, id2label
+
+    class Logits(torch.nn.Module):
+        # Plain tensor in and out, as tracing and export need
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, pixel_values):
+            return self.model(pixel_values=pixel_values).logits
+
+    # torch.jit.freeze only accepts modules in eval mode, and the exported graph must be in inference mode too
+    wrapper = Logits(model).eval()
+    example = torch.zeros(1, 3, processor.size["height"], processor.size["width"])
+    if backend == "torchscript":
+        with torch.no_grad():
+            traced = torch.jit.freeze(torch.jit.trace(wrapper, example, strict=False))
+        return traced, processor, id2label
+
+    import onnxruntime
+
+    path = os.path.join(ONNX_DIR, model_name.replace("/", "--") + ".onnx")
+    if not os.path.exists(path):
+        os.makedirs(ONNX_DIR, exist_ok=True)
+        torch.onnx.export(
+            wrapper, example, path, input_names=["pixel_values"], output_names=["logits"],
+            dynamic_axes={"pixel_values": {0: "batch"}, "logits": {0: "batch"}}, opset_version=17,
+        )
+    session = onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"])
+
+    def predict(pixel_values):
+        return torch.from_numpy(session.run(["logits"], {"pixel_values": pixel_values.numpy()})[0])
+
+    return predict, processor, id2label
+
+
+def get_model(model_name=MODEL_NAME, backend=None):
+    """
+    Load a model and its processor on first use, and share them across the process.
+
+    Concurrent callers, including a background warmup, wait for a single load.
+
+    Args:
+        model_name (str): Hugging Face model id.
+        backend (str, optional): One of BACKENDS, BACKEND if None.
+
+    Returns:
+        tuple: The predict function from pixel values to logits, the image
+        processor and the model's id2label mapping.
+    """
+    key = (model_name, backend or BACKEND)
+    with _lock:
+        if key in _models:
+            return _models[key]
+        event = _loading.get(key)
+        owner = event is None
+        if owner:
+            event = _loading[key] = threading.Event()
+
+    if not owner:
+        event.wait()
+        with _lock:
+            if key in _models:
+                return _models[key]
+        # The other load failed; try again ourselves
+        return get_model(*key)
+
+    try:
+        loaded = _load(*key)
+        with _lock:
+            _models[key] = loaded
+        return loaded
+    finally:
+        with _lock:
+            del _loading[key]
+        event.set()
+
+
+def is_loaded(model_name=MODEL_NAME, backend=None):
+    return (model_name, backend or BACKEND) in _models
+
+
+def warmup(model_name=MODEL_NAME, backend=None):
+    """
+    Start loading a model in a background thread, unless it is loaded or loading already.
+
+    Args:
+        model_name (str): Hugging Face model id.
+        backend (str, optional): One of BACKENDS, BACKEND if None.
+
+    Returns:
+        threading.Thread: The loading thread, or None if there was nothing to do.
+    """
+    key = (model_name, backend or BACKEND)
+    with _lock:
+        if key in _models or key in _loading:
+            return None
+
+    def run():
+        try:
+            get_model(*key)
+        except Exception:
+            # Errors surface again on the first label_image call
+            pass
+
+    thread = threading.Thread(target=run, name=f"warmup-{model_name}-{key[1]}", daemon=True)
+    thread.start()
+    return thread
+
+
+# Crops per forward pass in label_images
+LABEL_BATCH_SIZE = 16
+
+
+def _to_pil(image_input):
     # Check if the input is a file path, PIL Image, or OpenCV image
     if isinstance(image_input, str):  # If it's a path
-        image = Image.open(image_input).convert("RGB")
+        return Image.open(image_input).convert("RGB")
     elif isinstance(image_input, Image.Image):  # If it's already a PIL Image
-        image = image_input.convert("RGB")
+        return image_input.convert("RGB")
     elif isinstance(image_input, np.ndarray):  # If it's an OpenCV image (NumPy array)
         # Convert the cv2 image to RGB format and then to PIL
-        image = Image.fromarray(cv2.cvtColor(image_input, cv2.COLOR_BGR2RGB))
-    else:
-        raise ValueError("Input must be a file path, PIL.Image.Image, or a NumPy array.")
-
-    
-    # Preprocess the image
-    inputs = processor(images=image, return_tensors="pt")
-    
-    # Perform inference
-    with torch.no_grad():
-        outputs = model(**inputs)
-    
-    # Get the predicted label
-    logits = outputs.logits
-    predicted_label = logits.argmax(-1).item()
-    label = model.config.id2label[predicted_label]
-    return label.split(',')[0]
+        return Image.fromarray(cv2.cvtColor(image_input, cv2.COLOR_BGR2RGB))
+    raise ValueError("Input must be a file path, PIL.Image.Image, or a NumPy array.")
+
+
+def label_images(images, batch_size=LABEL_BATCH_SIZE, num_threads=None, model_name=MODEL_NAME, backend=None):
+    """
+    Label many images with batched forward passes.
+
+    Args:
+        images (list): File paths, PIL images or BGR NumPy arrays, e.g. crops from crop_to_object.
+        batch_size (int): Images per forward pass.
+        num_threads (int, optional): Threads torch may use for inference, its default if None.
+        model_name (str): Hugging Face model id.
+        backend (str, optional): One of BACKENDS, BACKEND if None.
+
+    Returns:
+        list: (label, confidence) per image, in input order, with the
+        confidence being the top-1 softmax probability.
+    """
+    if not images:
+        return []
+    import torch
+
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    predict, processor, id2label = get_model(model_name, backend)
+    pil_images = [_to_pil(image) for image in images]
+
+    results = []
+    for start in range(0, len(pil_images), batch_size):
+        # Preprocess the batch in one call
+        inputs = processor(images=pil_images[start:start + batch_size], return_tensors="pt")
+
+        # Perform inference
+        with torch.inference_mode():
+            logits = predict(inputs["pixel_values"])
+
+        # Get the predicted labels and their probabilities
+        confidences, predicted = logits.softmax(-1).max(-1)
+        for index, confidence in zip(predicted.tolist(), confidences.tolist()):
+            results.append((id2label[index].split(',')[0], confidence))
+    return results
+
+
+# Running totals of label_cascade, to tune CASCADE_THRESHOLD
+cascade_stats = {"crops": 0, "escalated": 0, "small_seconds": 0.0, "base_seconds": 0.0}
+
+
+def label_cascade(images, threshold=None, batch_size=LABEL_BATCH_SIZE, num_threads=None, backend=None):
+    """
+    Label many images with SMALL_MODEL_NAME, escalating only uncertain ones to MODEL_NAME.
+
+    Both models share the ImageNet-1k label set, so their labels are interchangeable.
+    Counts and timings are added to cascade_stats.
+
+    Args:
+        images (list): File paths, PIL images or BGR NumPy arrays.
+        threshold (float, optional): Escalate images below this top-1 confidence, CASCADE_THRESHOLD if None.
+        batch_size (int): Images per forward pass.
+        num_threads (int, optional): Threads torch may use for inference.
+        backend (str, optional): One of BACKENDS, BACKEND if None.
+
+    Returns:
+        list: (label, confidence) per image, in input order, from whichever model labeled it last.
+    """
+    threshold = CASCADE_THRESHOLD if threshold is None else threshold
+    images = [_to_pil(image) for image in images]
+
+    start = time.perf_counter()
+    results = label_images(images, batch_size, num_threads, SMALL_MODEL_NAME, backend)
+    small_seconds = time.perf_counter() - start
+
+    escalated = [i for i, (_, confidence) in enumerate(results) if confidence < threshold]
+    start = time.perf_counter()
+    for i, result in zip(escalated, label_images([images[i] for i in escalated], batch_size, num_threads,
+                                                   MODEL_NAME, backend)):
+        results[i] = result
+    base_seconds = time.perf_counter() - start
+
+    with _lock:
+        cascade_stats["crops"] += len(images)
+        cascade_stats["escalated"] += len(escalated)
+        cascade_stats["small_seconds"] += small_seconds
+        cascade_stats["base_seconds"] += base_seconds
+    return results
+
+
+# Function to label an image
+def label_image(image_input):
+    return label_images([image_input])[0][0]
 
 
 if __name__ == "__main__":
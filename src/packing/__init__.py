@@ -0,0 +1,6 @@
+from .engine import ShelfPacker, expand_items, pack, pack_shelf
+from .multibin import pack_shelves
+from .search import search_pack
+from .incremental import IncrementalPacker
+from .cache import LayoutCache, layout_key
+from .heightmap import HeightmapPacker, pack_heightmap
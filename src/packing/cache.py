@@ -0,0 +1,203 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import List, Tuple, Dict, Optional
+
+from .engine import ShelfPacker, expand_items, item_dimensions
+from .multibin import _pack_shelves
+from .search import _search
+from .rotation import allowed_rotations
+
+
+def _item_key(item: Dict) -> Tuple:
+    return (item_dimensions(item), allowed_rotations(item).tolist())
+
+
+def canonical_items(items: List[Dict]) -> List[Dict]:
+    """One copy per quantity, sorted by dimensions and rotation, so that equal inputs in any order line up."""
+    return sorted(expand_items(items), key=_item_key)
+
+
+def layout_key(items: List[Dict], shelves: List[Dict], **params) -> str:
+    """
+    Content hash of a packing job.
+
+    Only item dimensions and allowed rotations count, in sorted order, so the key
+    does not depend on item order or names. Shelf order does matter, since
+    layouts are reported per shelf.
+
+    Args:
+        items: Item dicts from st.session_state["items"]
+        shelves: Shelf dicts from st.session_state["shelves"]
+        **params: Any other settings that change the result, e.g. search seed
+
+    Returns:
+        Hex digest identifying the job
+    """
+    payload = {
+        "items": [_item_key(item) for item in canonical_items(items)],
+        "shelves": [item_dimensions(shelf) for shelf in shelves],
+        "params": params,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class LayoutCache:
+    """
+    LRU cache of packing results keyed by layout_key.
+
+    Layouts are stored by position in the canonical item order and mapped back
+    to the caller's items on every hit, so a hit for the same items in a
+    different order or under different names still returns their own names.
+    If a directory is given, entries are also written there as JSON and read
+    back after a restart.
+    """
+
+    def __init__(self, max_entries: int = 128, directory: Optional[str] = None, max_disk_entries: int = 1024):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # Shared by every session through st.cache_resource
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Look up a stored layout, counting the hit or miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+            if self.directory and os.path.exists(self._path(key)):
+                try:
+                    with open(self._path(key)) as f:
+                        entry = json.load(f)
+                    os.utime(self._path(key))
+                except (OSError, ValueError):
+                    entry = None
+                # A damaged file counts as a miss and is overwritten by the next put
+                if not isinstance(entry, dict) or not {"shelves", "unfitted", "extra"} <= entry.keys():
+                    entry = None
+                if entry is not None:
+                    self._remember(key, entry)
+                    self.hits += 1
+                    return entry
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, entry: Dict) -> None:
+        """Store a layout in memory and, if enabled, on disk."""
+        with self._lock:
+            self._remember(key, entry)
+            if self.directory:
+                # Write a temporary file and rename it, so a crash mid-write never leaves a truncated entry
+                fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "w") as f:
+                        json.dump(entry, f)
+                    os.replace(tmp, self._path(key))
+                except Exception:
+                    os.remove(tmp)
+                    raise
+                self._trim_disk()
+
+    def _remember(self, key: str, entry: Dict) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _trim_disk(self) -> None:
+        files = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".json")]
+        if len(files) <= self.max_disk_entries:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.max_disk_entries]:
+            os.remove(path)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def _cached(self, items: List[Dict], shelves: List[Dict], compute, **params) -> Tuple[List[ShelfPacker], List[Dict], Dict]:
+        canon = canonical_items(items)
+        key = layout_key(canon, shelves, **params)
+        entry = self.get(key)
+        if entry is None:
+            # Pack the canonical items, keyed by their canonical position
+            packers, unfitted_items, extra = compute([dict(item, id=i) for i, item in enumerate(canon)])
+            entry = {
+                "shelves": [
+                    [[i, fitted["position"], fitted["rotation"]] for i, fitted in zip(packer.keys, packer.fitted_items)]
+                    for packer in packers
+                ],
+                "unfitted": [item["id"] for item in unfitted_items],
+                "extra": extra,
+            }
+            self.put(key, entry)
+
+        packers = []
+        for shelf, placed in zip(shelves, entry["shelves"]):
+            packer = ShelfPacker(item_dimensions(shelf), capacity=max(len(placed), 1))
+            packer.load(
+                [
+                    {"name": canon[i]["name"], "size": item_dimensions(canon[i]), "position": tuple(position), "rotation": rotation}
+                    for i, position, rotation in placed
+                ],
+                [canon[i].get("id") for i, _, _ in placed],
+            )
+            packers.append(packer)
+        return packers, [canon[i] for i in entry["unfitted"]], entry["extra"]
+
+    def pack_shelves(self, items: List[Dict], shelves: List[Dict]) -> Tuple[List[ShelfPacker], List[Dict]]:
+        """
+        Cached _pack_shelves.
+
+        Returns:
+            Tuple of the ShelfPacker of each shelf and the unfitted items
+        """
+        def compute(canon):
+            packers, unfitted_items = _pack_shelves(canon, shelves)
+            return packers, unfitted_items, {}
+
+        packers, unfitted_items, _ = self._cached(items, shelves, compute, mode="pack")
+        return packers, unfitted_items
+
+    def search_pack(self,
+                    items: List[Dict],
+                    shelves: List[Dict],
+                    budget: float = 2.0,
+                    seed: int = 0,
+                    max_candidates: Optional[int] = None,
+                    on_improve=None) -> Tuple[List[Tuple[List[Dict], Tuple[float, float, float]]], List[Dict], float]:
+        """
+        Cached search_pack. on_improve is only called when the search actually runs.
+
+        Returns:
+            Same as search_pack
+        """
+        def compute(canon):
+            packers, unfitted_items, score = _search(canon, shelves, budget, seed, None, max_candidates, on_improve)
+            return packers, unfitted_items, {"score": score}
+
+        packers, unfitted_items, extra = self._cached(
+            items, shelves, compute, mode="search", budget=budget, seed=seed, max_candidates=max_candidates
+        )
+        placements = [(packer.fitted_items, packer.bin_size) for packer in packers]
+        return placements, unfitted_items, extra["score"]
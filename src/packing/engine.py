@@ -0,0 +1,489 @@
+import numpy as np
+from typing import List, Tuple, Dict, Optional, Sequence
+
+from .rotation import ROTATIONS, distinct_orientations, item_rotations, orientation_table
+
+# All packing geometry is fixed-point: dimensions are converted once to
+# integer units of 0.1 mm and only converted back to cm for display.
+UNITS_PER_CM = 100
+
+# Stand-in for "no obstacle" in integer distance arrays
+FAR = np.iinfo(np.int64).max
+
+# Number of candidate placements tested per vectorized overlap check
+POINT_CHUNK = 64
+
+
+def item_dimensions(item: Dict) -> Tuple[float, float, float]:
+    """Read (width, height, depth) from a session-state item or shelf dict."""
+    dims = item["dimensions"]
+    return (float(dims[0]), float(dims[1]), float(dims[2]))
+
+
+def to_units(values: Sequence[float], rounding: str = "nearest") -> np.ndarray:
+    """
+    Convert centimetres to integer fixed-point units.
+
+    Args:
+        values: Lengths in cm
+        rounding: "nearest" for positions, "up" for item sizes and "down" for
+            shelf sizes, so that off-grid inputs never lead to real overlaps
+
+    Returns:
+        int64 array of fixed-point units
+    """
+    scaled = np.asarray(values, dtype=float) * UNITS_PER_CM
+    if rounding == "up":
+        scaled = np.ceil(scaled - 1e-6)
+    elif rounding == "down":
+        scaled = np.floor(scaled + 1e-6)
+    return np.rint(scaled).astype(np.int64)
+
+
+def from_units(values: Sequence[int]) -> Tuple[float, ...]:
+    """Convert integer fixed-point units back to centimetres for display."""
+    return tuple(int(v) / UNITS_PER_CM for v in values)
+
+
+class ShelfPacker:
+    """
+    Extreme-point packer for a single shelf.
+
+    Placed boxes are kept as int64 arrays of min and max corners in fixed-point
+    units, so that every candidate position can be tested against all of them
+    in one exact, vectorized overlap check. Each extreme point also tracks the free distance to the
+    nearest obstacle along each axis, which cheaply rules out most candidates
+    before the overlap check. New items are placed at the lowest
+    (height, depth, width) extreme point at which they fit.
+    """
+
+    def __init__(self,
+                 bin_size: Sequence[float],
+                 capacity: int = 64,
+                 min_size: float = 0.0,
+                 rotation_order: Optional[Sequence[int]] = None):
+        self.bin_size = tuple(float(d) for d in bin_size)
+        self._size = to_units(self.bin_size, "down")
+        self._mins = np.empty((capacity, 3), dtype=np.int64)
+        self._maxs = np.empty((capacity, 3), dtype=np.int64)
+        self._count = 0
+        self._points = np.zeros((1, 3), dtype=np.int64)
+        self._space = self._size[None, :].copy()
+        self._failed = []
+        # Extreme points with less free space than this along any axis are dropped
+        self.min_size = float(min_size)
+        self._min_units = max(int(to_units([min_size], "down")[0]), 1)
+        # Order in which orientations are tried at each extreme point
+        self.rotation_order = np.arange(len(ROTATIONS)) if rotation_order is None else np.asarray(rotation_order)
+        self.fitted_items: List[Dict] = []
+        self.unfitted_items: List[Dict] = []
+        # Caller-supplied key of each fitted item, aligned with fitted_items
+        self.keys: List = []
+
+    @property
+    def volume(self) -> float:
+        return float(np.prod(self._size)) / UNITS_PER_CM ** 3
+
+    @property
+    def used_volume(self) -> float:
+        n = self._count
+        return float(np.prod(self._maxs[:n] - self._mins[:n], axis=1).sum()) / UNITS_PER_CM ** 3
+
+    def utilization(self) -> float:
+        """Fraction of the shelf volume occupied by fitted items."""
+        return self.used_volume / self.volume if self.volume else 0.0
+
+    def _find_position(self, size: np.ndarray, rotations: np.ndarray) -> Optional[Tuple[np.ndarray, int]]:
+        """
+        Find the first extreme point at which an item fits.
+
+        Args:
+            size: Item dimensions (width, height, depth) in fixed-point units
+            rotations: Distinct rotation ids to try, in preference order
+
+        Returns:
+            (position in fixed-point units, rotation) or None if the item does not fit
+        """
+        dims = size[ROTATIONS[rotations]]
+
+        # Anything at least as large as an item that failed in every orientation
+        # cannot fit either
+        key = np.sort(size)
+        for failed in self._failed:
+            if np.all(key >= failed):
+                return None
+
+        n = self._count
+        mins, maxs = self._mins[:n], self._maxs[:n]
+        k = len(dims)
+
+        # Candidates whose dimensions exceed the free distance along any axis can never fit
+        fits = np.all(dims[None, :, :] <= self._space[:, None, :], axis=2).ravel()
+        cand = np.flatnonzero(fits)
+
+        for start in range(0, len(cand), POINT_CHUNK):
+            chunk = cand[start:start + POINT_CHUNK]
+            lo = self._points[chunk // k]
+            hi = lo + dims[chunk % k]
+            if n:
+                overlap = np.all(
+                    (lo[:, None, :] < maxs[None, :, :]) &
+                    (mins[None, :, :] < hi[:, None, :]),
+                    axis=2,
+                ).any(axis=1)
+                hits = np.flatnonzero(~overlap)
+            else:
+                hits = np.arange(len(chunk))
+            if len(hits):
+                first = hits[0]
+                return lo[first], int(rotations[chunk[first] % k])
+
+        if len(rotations) == distinct_orientations(size):
+            self._failed.append(key)
+        return None
+
+    def _add_box(self, lo: np.ndarray, hi: np.ndarray) -> None:
+        if self._count == len(self._mins):
+            self._mins = np.concatenate([self._mins, np.empty_like(self._mins)])
+            self._maxs = np.concatenate([self._maxs, np.empty_like(self._maxs)])
+        self._mins[self._count] = lo
+        self._maxs[self._count] = hi
+        self._count += 1
+
+    def _project(self, pts: np.ndarray, axis: int) -> np.ndarray:
+        """Slide points along -axis until they rest on a placed box or the shelf wall."""
+        n = self._count
+        mins, maxs = self._mins[:n], self._maxs[:n]
+        others = [a for a in range(3) if a != axis]
+        inside = np.ones((len(pts), n), dtype=bool)
+        for a in others:
+            inside &= (mins[None, :, a] <= pts[:, None, a]) & (pts[:, None, a] < maxs[None, :, a])
+        below = inside & (maxs[None, :, axis] <= pts[:, None, axis])
+        stops = np.where(below, maxs[None, :, axis], 0).max(axis=1, initial=0)
+        projected = pts.copy()
+        projected[:, axis] = stops
+        return projected
+
+    def _free_space(self, pts: np.ndarray, mins: np.ndarray, maxs: np.ndarray) -> np.ndarray:
+        """Distance from each point to the nearest box or wall along +x, +y and +z."""
+        space = np.broadcast_to(self._size - pts, pts.shape).copy()
+        for axis in range(3):
+            ray = np.ones((len(pts), len(mins)), dtype=bool)
+            for a in range(3):
+                if a != axis:
+                    ray &= (mins[None, :, a] <= pts[:, None, a]) & (pts[:, None, a] < maxs[None, :, a])
+            ray &= maxs[None, :, axis] > pts[:, None, axis]
+            gap = np.maximum(mins[None, :, axis] - pts[:, None, axis], 0)
+            space[:, axis] = np.minimum(space[:, axis], np.where(ray, gap, FAR).min(axis=1, initial=FAR))
+        return space
+
+    def _update_points(self, lo: np.ndarray, hi: np.ndarray) -> None:
+        new = np.repeat(lo[None, :], 3, axis=0)
+        new[np.arange(3), np.arange(3)] = hi
+        new = new[np.all(new < self._size, axis=1)]
+        if len(new):
+            new = np.concatenate([new, self._project(new, 1), self._project(new, 2)])
+
+        n = self._count
+        space = self._free_space(self._points, lo[None, :], hi[None, :])
+        space = np.minimum(self._space, space)
+        if len(new):
+            space = np.concatenate([space, self._free_space(new, self._mins[:n], self._maxs[:n])])
+
+        pts = np.concatenate([self._points, new])
+        keep = ~np.all((pts >= lo) & (pts < hi), axis=1)
+        self._set_points(pts[keep], space[keep])
+
+    def _set_points(self, pts: np.ndarray, space: np.ndarray) -> None:
+        """Deduplicate, prune and sort extreme points along with their free space."""
+        keep = np.all(space >= self._min_units, axis=1)
+        pts, first = np.unique(pts[keep], axis=0, return_index=True)
+        space = space[keep][first]
+        order = np.lexsort((pts[:, 0], pts[:, 2], pts[:, 1]))
+        self._points, self._space = pts[order], space[order]
+
+    def _rebuild_points(self) -> None:
+        """Regenerate all extreme points from the placed boxes."""
+        n = self._count
+        mins, maxs = self._mins[:n], self._maxs[:n]
+        corners = np.repeat(mins[:, None, :], 3, axis=1)
+        corners[:, np.arange(3), np.arange(3)] = maxs
+        pts = np.concatenate([np.zeros((1, 3), dtype=np.int64), corners.reshape(-1, 3)])
+        pts = pts[np.all(pts < self._size, axis=1)]
+        pts = np.concatenate([pts, self._project(pts, 1), self._project(pts, 2)])
+        covered = np.all((pts[:, None, :] >= mins[None, :, :]) & (pts[:, None, :] < maxs[None, :, :]), axis=2)
+        pts = pts[~covered.any(axis=1)]
+        self._set_points(pts, self._free_space(pts, mins, maxs))
+
+    def set_min_size(self, min_size: float = 0.0) -> None:
+        """
+        Change the pruning threshold of extreme points and regenerate them.
+
+        Lowering it brings back free space that was dropped as too small,
+        e.g. before adding items smaller than the ones packed so far.
+
+        Args:
+            min_size: Smallest free space along any axis worth keeping, in cm
+        """
+        self.min_size = float(min_size)
+        self._min_units = max(int(to_units([min_size], "down")[0]), 1)
+        self._rebuild_points()
+
+    def place(self,
+              name: str,
+              size: Sequence[float],
+              rotations: Optional[Sequence[int]] = None,
+              key=None) -> Optional[Dict]:
+        """
+        Place a single item in the shelf.
+
+        Args:
+            name: Item name
+            size: Item dimensions (width, height, depth)
+            rotations: Distinct rotation ids to try in preference order, as
+                returned by item_rotations; all distinct orientations in
+                rotation_order if None
+            key: Optional identifier stored in keys alongside the fitted item
+
+        Returns:
+            Fitted item dict in the format of parse_packer_output, or None
+        """
+        size = tuple(float(d) for d in size)
+        units = to_units(size, "up")
+        if rotations is None:
+            _, ids, valid = orientation_table(units, order=self.rotation_order)
+            rotations = ids[0][valid[0]]
+        found = self._find_position(units, np.asarray(rotations, dtype=int))
+        if found is None:
+            return None
+
+        lo, rotation = found
+        hi = lo + units[ROTATIONS[rotation]]
+        self._add_box(lo, hi)
+        self._update_points(lo, hi)
+
+        fitted = {
+            "name": name,
+            "size": size,
+            "position": from_units(lo),
+            "rotation": rotation,
+        }
+        self.fitted_items.append(fitted)
+        self.keys.append(key)
+        return fitted
+
+    def _block_shapes(self, size: np.ndarray, count: int, rotations: np.ndarray) -> List[Tuple[int, np.ndarray]]:
+        """
+        Candidate (rotation, (nx, ny, nz)) blocks of up to count copies, largest first.
+
+        Each block fills a floor row along x, then rows along z, then layers
+        along y, and is capped by the shelf size. Smaller blocks are tried with
+        the target count halved each time, down to two copies.
+        """
+        shapes = {}
+        for order, rotation in enumerate(rotations):
+            w, h, d = size[ROTATIONS[rotation]]
+            fit = self._size // np.array([w, h, d])
+            if np.any(fit == 0):
+                continue
+            target = count
+            while target > 1:
+                nx = min(fit[0], target)
+                nz = min(fit[2], target // nx)
+                ny = min(fit[1], target // (nx * nz))
+                shapes.setdefault((int(rotation), nx, ny, nz), (-nx * ny * nz, order))
+                target //= 2
+        return [(r, np.array(n)) for r, *n in sorted(shapes, key=shapes.get)]
+
+    def place_block(self,
+                    names: List[str],
+                    size: Sequence[float],
+                    rotations: Optional[Sequence[int]] = None,
+                    keys: Optional[List] = None) -> List[Dict]:
+        """
+        Place copies of one item as a single homogeneous block.
+
+        The largest block of at most len(names) copies that fits is searched
+        for as one box, so a stack of identical items costs one placement
+        rather than one per copy. Every copy is still recorded as its own
+        fitted item.
+
+        Args:
+            names: Name of each copy still to be placed
+            size: Item dimensions (width, height, depth), shared by all copies
+            rotations: Distinct rotation ids to try, as in place
+            keys: Key of each copy, aligned with names
+
+        Returns:
+            Fitted item dicts of the copies in the block, in names order, empty if none fit
+        """
+        size = tuple(float(d) for d in size)
+        units = to_units(size, "up")
+        if rotations is None:
+            _, ids, valid = orientation_table(units, order=self.rotation_order)
+            rotations = ids[0][valid[0]]
+        keys = keys or [None] * len(names)
+
+        for rotation, counts in self._block_shapes(units, len(names), np.asarray(rotations, dtype=int)):
+            dims = units[ROTATIONS[rotation]]
+            found = self._find_position(dims * counts, np.zeros(1, dtype=int))
+            if found is None:
+                continue
+
+            lo = found[0]
+            fitted_items = []
+            for j in range(counts[1]):
+                for k in range(counts[2]):
+                    for i in range(counts[0]):
+                        copy_lo = lo + dims * np.array([i, j, k])
+                        self._add_box(copy_lo, copy_lo + dims)
+                        fitted = {
+                            "name": names[len(fitted_items)],
+                            "size": size,
+                            "position": from_units(copy_lo),
+                            "rotation": int(rotation),
+                        }
+                        self.fitted_items.append(fitted)
+                        self.keys.append(keys[len(fitted_items)])
+                        fitted_items.append(fitted)
+            # The copies tile the block exactly, so its corners are the new extreme points
+            self._update_points(lo, lo + dims * counts)
+            return fitted_items
+
+        fitted = self.place(names[0], size, rotations, keys[0])
+        return [fitted] if fitted is not None else []
+
+    def load(self, fitted_items: List[Dict], keys: Optional[List] = None) -> None:
+        """
+        Add already-positioned items, e.g. a cached layout, without searching.
+
+        Args:
+            fitted_items: Fitted item dicts in the format of parse_packer_output
+            keys: Key of each item, aligned with fitted_items
+        """
+        for fitted, key in zip(fitted_items, keys or [None] * len(fitted_items)):
+            lo = to_units(fitted["position"])
+            self._add_box(lo, lo + to_units(fitted["size"], "up")[ROTATIONS[fitted["rotation"]]])
+            self.fitted_items.append(fitted)
+            self.keys.append(key)
+        self._rebuild_points()
+
+    def remove(self, index: int) -> Dict:
+        """
+        Remove a fitted item and free its space, leaving every other item in place.
+
+        Args:
+            index: Position of the item in fitted_items
+
+        Returns:
+            The removed fitted item dict
+        """
+        n = self._count
+        self._mins[index:n - 1] = self._mins[index + 1:n]
+        self._maxs[index:n - 1] = self._maxs[index + 1:n]
+        self._count -= 1
+        # Freed space may let previously failed sizes fit again
+        self._failed = []
+        self._rebuild_points()
+        self.keys.pop(index)
+        return self.fitted_items.pop(index)
+
+
+def expand_items(items: List[Dict]) -> List[Dict]:
+    """
+    One item dict per copy of every item with a "quantity".
+
+    Copies get the id (item id, copy index) and stay next to each other, so
+    that place_items can pack them as blocks.
+    """
+    expanded = []
+    for item in items:
+        quantity = int(item.get("quantity", 1))
+        if quantity == 1:
+            expanded.append(item)
+            continue
+        expanded.extend(dict(item, id=(item.get("id"), k), quantity=1) for k in range(quantity))
+    return expanded
+
+
+def place_items(packer: ShelfPacker, items: List[Dict], rotation_order: Optional[Sequence[int]] = None) -> List[int]:
+    """
+    Place items in list order, packing runs of identical items as blocks.
+
+    Args:
+        packer: Shelf to place the items in
+        items: Item dicts; consecutive items with the same dimensions and
+            allowed rotations form one run
+        rotation_order: Rotation ids in preference order
+
+    Returns:
+        Indices of the items that did not fit
+    """
+    failed = []
+    rotations = item_rotations(items, rotation_order)
+    start = 0
+    while start < len(items):
+        sku = (item_dimensions(items[start]), tuple(rotations[start]))
+        end = start + 1
+        while end < len(items) and (item_dimensions(items[end]), tuple(rotations[end])) == sku:
+            end += 1
+
+        if end - start == 1:
+            if packer.place(items[start]["name"], sku[0], rotations[start], items[start].get("id")) is None:
+                failed.append(start)
+        else:
+            run = items[start:end]
+            while run:
+                placed = packer.place_block([item["name"] for item in run], sku[0], rotations[start],
+                                            [item.get("id") for item in run])
+                if not placed:
+                    # Not even a single copy fits, so neither will the rest of the run
+                    failed.extend(range(end - len(run), end))
+                    break
+                run = run[len(placed):]
+        start = end
+    return failed
+
+
+def sort_by_volume(items: List[Dict], bigger_first: bool = True) -> List[Dict]:
+    """Order items by volume, largest first by default."""
+    return sorted(items, key=lambda item: float(np.prod(item_dimensions(item))), reverse=bigger_first)
+
+
+def pack_shelf(items: List[Dict], shelf: Dict, bigger_first: bool = True) -> ShelfPacker:
+    """
+    Pack session-state items into a single session-state shelf.
+
+    Args:
+        items: Item dicts with "name", "rotation" and "dimensions", optionally
+            restricted further by "allowed_rotations" and repeated by "quantity"
+        shelf: Shelf dict with "dimensions"
+        bigger_first: Place larger items first
+
+    Returns:
+        ShelfPacker holding the fitted and unfitted items
+    """
+    items = sort_by_volume(expand_items(items), bigger_first)
+    min_size = min((min(item_dimensions(item)) for item in items), default=0.0)
+    packer = ShelfPacker(item_dimensions(shelf), capacity=max(len(items), 1), min_size=min_size)
+    for i in place_items(packer, items):
+        packer.unfitted_items.append(items[i])
+    return packer
+
+
+def pack(items: List[Dict], shelf: Dict) -> Tuple[List[Dict], Tuple[float, float, float]]:
+    """
+    Drop-in replacement for building a py3dbp Packer and calling parse_packer_output.
+
+    Args:
+        items: Item dicts from st.session_state["items"]
+        shelf: Shelf dict from st.session_state["shelves"]
+
+    Returns:
+        Tuple of fitted items and bin dimensions, as returned by parse_packer_output
+
+    Example:
+        fitted_items, bin_size = pack(st.session_state["items"], st.session_state["shelves"][0])
+    """
+    packer = pack_shelf(items, shelf)
+    return packer.fitted_items, packer.bin_size
@@ -0,0 +1,224 @@
+import numpy as np
+from scipy.optimize import milp, LinearConstraint, Bounds
+from scipy.sparse import coo_matrix
+from typing import List, Tuple, Dict
+
+from .engine import expand_items, item_dimensions, pack_shelf
+from .rotation import ROTATIONS, item_rotations
+
+# Above this many items the model gets too large to be worth solving exactly
+MAX_EXACT_ITEMS = 20
+
+# An item resting on another must overlap its top face by at least this much along width and depth, in cm
+MIN_SUPPORT_OVERLAP = 0.1
+
+# Slack for the layout checks, in cm
+TOLERANCE = 1e-4
+
+
+def _orientations(item: Dict, rotations: np.ndarray) -> List[Tuple[int, np.ndarray]]:
+    """(rotation, dims) pairs for the distinct allowed orientations of an item."""
+    size = np.asarray(item_dimensions(item))
+    return [(int(r), size[ROTATIONS[r]]) for r in rotations]
+
+
+def _supported(fitted_items: List[Dict]) -> bool:
+    """Whether every fitted item stands on the shelf floor or on the top face of another item."""
+    lo = np.array([f["position"] for f in fitted_items], dtype=float).reshape(-1, 3)
+    hi = lo + np.array([np.asarray(f["size"], dtype=float)[ROTATIONS[f["rotation"]]] for f in fitted_items]).reshape(-1, 3)
+    on_top = np.abs(lo[:, None, 1] - hi[None, :, 1]) <= TOLERANCE
+    for axis in (0, 2):
+        on_top &= np.minimum(hi[:, None, axis], hi[None, :, axis]) - np.maximum(lo[:, None, axis], lo[None, :, axis]) > TOLERANCE
+    return bool(np.all((lo[:, 1] <= TOLERANCE) | on_top.any(axis=1)))
+
+
+def pack_exact(items: List[Dict],
+               shelf: Dict,
+               time_limit: float = 10.0) -> Tuple[List[Dict], Tuple[float, float, float], List[Dict], float]:
+    """
+    Pack a small set of items into one shelf by solving a MILP.
+
+    Maximizes the packed volume. Each item gets a packed flag, one binary per
+    distinct orientation and continuous x, y, z coordinates; every pair of
+    items gets six big-M separation binaries (left/right, below/above,
+    behind/in front), at least one of which must hold when both are packed.
+    Packed items must be supported: each gets a floor binary and one binary
+    per other item it may rest on, which pins it to that item's top face
+    with overlapping footprints, and one of them must hold. The
+    extreme-point heuristic result is used as a fallback, so a feasible
+    layout is always returned even when the solver runs out of time.
+
+    Args:
+        items: Item dicts from st.session_state["items"], at most MAX_EXACT_ITEMS
+        shelf: Shelf dict from st.session_state["shelves"]
+        time_limit: Solver time limit in seconds
+
+    Returns:
+        Tuple containing:
+            - List[Dict]: Fitted items, as returned by parse_packer_output
+            - Tuple[float, float, float]: Bin dimensions (width, height, depth)
+            - List[Dict]: Items left out
+            - float: Relative optimality gap of the returned layout (0.0 if proven optimal)
+    """
+    items = expand_items(items)
+    if len(items) > MAX_EXACT_ITEMS:
+        raise ValueError(f"Exact packing supports at most {MAX_EXACT_ITEMS} items, got {len(items)}.")
+
+    bin_size = item_dimensions(shelf)
+    size = np.asarray(bin_size)
+    scale = float(np.prod(size))
+    n = len(items)
+    volumes = np.array([np.prod(item_dimensions(item)) for item in items]) / scale
+
+    # Heuristic incumbent
+    heuristic = pack_shelf(items, shelf)
+    heuristic_value = heuristic.used_volume / scale
+    upper = min(1.0, float(volumes.sum()))
+    # The heuristic may leave items overhanging empty space; such layouts only serve as a last resort
+    if not _supported(heuristic.fitted_items):
+        heuristic_value = 0.0
+    elif n == 0 or heuristic_value >= upper - 1e-9:
+        return heuristic.fitted_items, bin_size, heuristic.unfitted_items, 0.0
+
+    # Variable layout: packed flags, orientation flags, coordinates, pair separations
+    orientations = [_orientations(item, rotations) for item, rotations in zip(items, item_rotations(items))]
+    p0 = 0
+    o0 = np.cumsum([n] + [len(o) for o in orientations])[:-1]
+    c0 = n + sum(len(o) for o in orientations)
+    pairs = [(i, j) for i in range(n) for j in range(i + 1, n)]
+    s0 = c0 + 3 * n
+    ordered = [(i, j) for i in range(n) for j in range(n) if i != j]
+    g0 = s0 + 6 * len(pairs)
+    r0 = g0 + n
+    nvars = r0 + len(ordered)
+
+    rows, cols, vals, lb, ub = [], [], [], [], []
+
+    def add_row(entries, lo, hi):
+        r = len(lb)
+        for col, val in entries:
+            rows.append(r)
+            cols.append(col)
+            vals.append(val)
+        lb.append(lo)
+        ub.append(hi)
+
+    def length(i, axis):
+        return [(o0[i] + k, dims[axis]) for k, (_, dims) in enumerate(orientations[i])]
+
+    for i in range(n):
+        # Exactly one orientation if packed, none otherwise
+        add_row([(o0[i] + k, 1.0) for k in range(len(orientations[i]))] + [(p0 + i, -1.0)], 0.0, 0.0)
+        # Stay inside the shelf
+        for axis in range(3):
+            add_row([(c0 + 3 * i + axis, 1.0)] + length(i, axis), -np.inf, size[axis])
+
+    for q, (i, j) in enumerate(pairs):
+        base = s0 + 6 * q
+        for axis in range(3):
+            big_m = size[axis]
+            # i before j along axis
+            add_row([(c0 + 3 * i + axis, 1.0), (c0 + 3 * j + axis, -1.0), (base + 2 * axis, big_m)] + length(i, axis),
+                    -np.inf, big_m)
+            # j before i along axis
+            add_row([(c0 + 3 * j + axis, 1.0), (c0 + 3 * i + axis, -1.0), (base + 2 * axis + 1, big_m)] + length(j, axis),
+                    -np.inf, big_m)
+        # Some separation must hold if both items are packed
+        add_row([(base + k, 1.0) for k in range(6)] + [(p0 + i, -1.0), (p0 + j, -1.0)], -1.0, np.inf)
+
+    for i in range(n):
+        # On the floor, or resting on some other item, if packed
+        add_row([(g0 + i, 1.0)] + [(r0 + q, 1.0) for q, (a, _) in enumerate(ordered) if a == i] + [(p0 + i, -1.0)],
+                0.0, np.inf)
+        add_row([(c0 + 3 * i + 1, 1.0), (g0 + i, size[1])], -np.inf, size[1])
+
+    for q, (i, j) in enumerate(ordered):
+        rest = r0 + q
+        # Only on a packed item
+        add_row([(rest, 1.0), (p0 + j, -1.0)], -np.inf, 0.0)
+        # Bottom of i at the top of j
+        top_j = [(col, -val) for col, val in length(j, 1)]
+        add_row([(c0 + 3 * i + 1, 1.0), (c0 + 3 * j + 1, -1.0), (rest, size[1])] + top_j, -np.inf, size[1])
+        add_row([(c0 + 3 * i + 1, 1.0), (c0 + 3 * j + 1, -1.0), (rest, -size[1])] + top_j, -size[1], np.inf)
+        # Footprints overlap along width and depth
+        for axis in (0, 2):
+            big_m = size[axis] + MIN_SUPPORT_OVERLAP
+            for a, b in ((i, j), (j, i)):
+                add_row([(c0 + 3 * a + axis, 1.0), (c0 + 3 * b + axis, -1.0), (rest, big_m)]
+                        + [(col, -val) for col, val in length(b, axis)], -np.inf, big_m - MIN_SUPPORT_OVERLAP)
+
+    # Packed volume cannot exceed the shelf volume
+    add_row([(p0 + i, volumes[i]) for i in range(n)], -np.inf, 1.0)
+    # Must do at least as well as the heuristic
+    add_row([(p0 + i, volumes[i]) for i in range(n)], heuristic_value - 1e-9, np.inf)
+
+    A = coo_matrix((vals, (rows, cols)), shape=(len(lb), nvars))
+    cost = np.zeros(nvars)
+    cost[p0:p0 + n] = -volumes
+    integrality = np.ones(nvars)
+    integrality[c0:c0 + 3 * n] = 0
+    lower = np.zeros(nvars)
+    upper_bounds = np.ones(nvars)
+    upper_bounds[c0:c0 + 3 * n] = np.tile(size, n)
+
+    result = milp(
+        cost,
+        constraints=LinearConstraint(A, lb, ub),
+        integrality=integrality,
+        bounds=Bounds(lower, upper_bounds),
+        options={"time_limit": time_limit},
+    )
+
+    bound = upper
+    if getattr(result, "mip_dual_bound", None) is not None and np.isfinite(result.mip_dual_bound):
+        bound = min(bound, -result.mip_dual_bound)
+    if result.x is None or (heuristic_value > 0 and -result.fun <= heuristic_value + 1e-9):
+        gap = 0.0 if result.status == 0 and heuristic_value > 0 else max(0.0, (bound - heuristic_value) / bound)
+        return heuristic.fitted_items, bin_size, heuristic.unfitted_items, gap
+
+    x = result.x
+    fitted_items, unfitted_items = [], []
+    for i, item in enumerate(items):
+        if x[p0 + i] < 0.5:
+            unfitted_items.append(item)
+            continue
+        k = int(np.argmax(x[o0[i]:o0[i] + len(orientations[i])]))
+        position = x[c0 + 3 * i:c0 + 3 * i + 3]
+        fitted_items.append({
+            "name": item["name"],
+            "size": item_dimensions(item),
+            "position": tuple(float(v) for v in position),
+            "rotation": int(orientations[i][k][0]),
+        })
+
+    # Place items bottom-up so the step-by-step visualization reads naturally
+    fitted_items.sort(key=lambda f: (f["position"][1], f["position"][2], f["position"][0]))
+    value = -result.fun
+    gap = 0.0 if result.status == 0 else max(0.0, (bound - value) / bound)
+    return fitted_items, bin_size, unfitted_items, gap
+
+
+def pack_exact_shelves(items: List[Dict],
+                       shelves: List[Dict],
+                       time_limit: float = 10.0) -> Tuple[List[Tuple[List[Dict], Tuple[float, float, float]]], List[Dict], List[float]]:
+    """
+    Exact packing over several shelves, solved one shelf at a time.
+
+    Items left out of a shelf are passed on to the next one, and the time
+    limit is split evenly between shelves.
+
+    Args:
+        items: Item dicts from st.session_state["items"], at most MAX_EXACT_ITEMS
+        shelves: Shelf dicts from st.session_state["shelves"]
+        time_limit: Total solver time limit in seconds
+
+    Returns:
+        Tuple of (fitted_items, bin_size) per shelf, the unfitted items and the optimality gap per shelf
+    """
+    placements, gaps = [], []
+    remaining = expand_items(items)
+    for shelf in shelves:
+        fitted_items, bin_size, remaining, gap = pack_exact(remaining, shelf, time_limit / len(shelves))
+        placements.append((fitted_items, bin_size))
+        gaps.append(gap)
+    return placements, remaining, gaps
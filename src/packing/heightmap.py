@@ -0,0 +1,156 @@
+import numpy as np
+from scipy.ndimage import maximum_filter1d
+from typing import List, Tuple, Dict, Optional, Sequence
+
+from .engine import expand_items, item_dimensions, sort_by_volume, to_units, from_units
+from .rotation import ROTATIONS, distinct_orientations, item_rotations
+
+# Default grid cell size in cm
+DEFAULT_RESOLUTION = 0.5
+
+
+def _window_max(grid: np.ndarray, size: int, axis: int) -> np.ndarray:
+    """Max over every window of `size` cells starting at each valid index along axis."""
+    out = maximum_filter1d(grid, size, axis=axis, origin=-(size // 2))
+    valid = grid.shape[axis] - size + 1
+    return out[:valid] if axis == 0 else out[:, :valid]
+
+
+class HeightmapPacker:
+    """
+    Skyline packer that keeps a shelf as a 2D heightmap.
+
+    The floor (width x depth) is a grid of cells, each holding the current
+    stack height in cells. Placing an item is a sliding-window max over the
+    grid for each orientation, so the cost depends on the grid size rather than
+    on how many items are already placed. Dimensions are rounded up to whole
+    cells, so layouts are slightly conservative but never overlap. Items rest
+    on the highest point under their footprint and the spot with the lowest
+    resulting top is chosen.
+    """
+
+    def __init__(self, bin_size: Sequence[float], resolution: float = DEFAULT_RESOLUTION):
+        self.bin_size = tuple(float(d) for d in bin_size)
+        self.resolution = float(resolution)
+        self._unit = max(int(to_units([resolution])[0]), 1)
+        self._cells = to_units(self.bin_size, "down") // self._unit
+        self.heightmap = np.zeros((self._cells[0], self._cells[2]), dtype=np.int32)
+        self.fitted_items: List[Dict] = []
+        self.keys: List = []
+        self.used_volume = 0.0
+        # Sorted cell sizes of items that did not fit; anything larger cannot fit either
+        self._failed = []
+
+    @property
+    def volume(self) -> float:
+        return float(np.prod(self.bin_size))
+
+    def utilization(self) -> float:
+        """Fraction of the shelf volume occupied by fitted items."""
+        return self.used_volume / self.volume if self.volume else 0.0
+
+    def _to_cells(self, size: Sequence[float]) -> np.ndarray:
+        """Item size in whole cells, rounded up."""
+        return -(-to_units(size, "up") // self._unit)
+
+    def find_position(self, size: Sequence[float], rotations: Sequence[int]) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Find the lowest spot for an item.
+
+        Args:
+            size: Item dimensions (width, height, depth)
+            rotations: Distinct rotation ids to try, as returned by item_rotations
+
+        Returns:
+            (x cell, base height in cells, z cell, rotation) or None if the item does not fit
+        """
+        cells = self._to_cells(size)[ROTATIONS[list(rotations)]]
+        key = np.sort(cells[0])
+        if any(np.all(key >= failed) for failed in self._failed):
+            return None
+
+        best = None
+        for rotation, (w, h, d) in zip(rotations, cells):
+            if w > self._cells[0] or h > self._cells[1] or d > self._cells[2]:
+                continue
+            # Max height under every w x d footprint, separably along x then z
+            base = _window_max(self.heightmap, w, axis=0)
+            base = _window_max(base, d, axis=1)
+            top = base + h
+            flat = int(np.argmin(top))
+            lowest = int(top.flat[flat])
+            if lowest > self._cells[1]:
+                continue
+            if best is None or lowest < best[0]:
+                x, z = np.unravel_index(flat, top.shape)
+                best = (lowest, int(x), int(base[x, z]), int(z), rotation)
+        if best is None:
+            if len(rotations) == distinct_orientations(size):
+                self._failed.append(key)
+            return None
+        return best[1:]
+
+    def place(self,
+              name: str,
+              size: Sequence[float],
+              rotations: Optional[Sequence[int]] = None,
+              key=None) -> Optional[Dict]:
+        """
+        Place a single item in the shelf.
+
+        Args:
+            name: Item name
+            size: Item dimensions (width, height, depth)
+            rotations: Distinct rotation ids to try, all distinct orientations if None
+            key: Optional identifier stored in keys alongside the fitted item
+
+        Returns:
+            Fitted item dict in the format of parse_packer_output, or None
+        """
+        size = tuple(float(d) for d in size)
+        if rotations is None:
+            rotations = item_rotations([{"dimensions": size}])[0]
+        found = self.find_position(size, rotations)
+        if found is None:
+            return None
+
+        x, y, z, rotation = found
+        w, h, d = self._to_cells(size)[ROTATIONS[rotation]]
+        self.heightmap[x:x + w, z:z + d] = y + h
+        self.used_volume += float(np.prod(size))
+
+        fitted = {
+            "name": name,
+            "size": size,
+            "position": from_units(np.array([x, y, z]) * self._unit),
+            "rotation": rotation,
+        }
+        self.fitted_items.append(fitted)
+        self.keys.append(key)
+        return fitted
+
+
+def pack_heightmap(items: List[Dict],
+                   shelves: List[Dict],
+                   resolution: float = DEFAULT_RESOLUTION) -> Tuple[List[Tuple[List[Dict], Tuple[float, float, float]]], List[Dict]]:
+    """
+    Pack session-state items first-fit across shelves with heightmap packers.
+
+    Args:
+        items: Item dicts from st.session_state["items"]
+        shelves: Shelf dicts from st.session_state["shelves"]
+        resolution: Grid cell size in cm
+
+    Returns:
+        Tuple of (fitted_items, bin_size) per shelf and the unfitted items, as pack_shelves
+    """
+    packers = [HeightmapPacker(item_dimensions(shelf), resolution) for shelf in shelves]
+    unfitted_items = []
+    items = sort_by_volume(expand_items(items))
+    for item, rotations in zip(items, item_rotations(items)):
+        for packer in packers:
+            if packer.place(item["name"], item_dimensions(item), rotations, item.get("id")) is not None:
+                break
+        else:
+            unfitted_items.append(item)
+    return [(packer.fitted_items, packer.bin_size) for packer in packers], unfitted_items
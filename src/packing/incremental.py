@@ -0,0 +1,130 @@
+from typing import List, Tuple, Dict, Optional
+
+from .engine import ShelfPacker, expand_items, item_dimensions
+from .multibin import _pack_shelves
+from .cache import LayoutCache
+from .rotation import item_rotations
+
+
+class IncrementalPacker:
+    """
+    Multi-shelf layout that is updated in place as items come and go.
+
+    Adding an item only searches the free space of the existing layout, and
+    removing one frees its space without moving anything else. Items are
+    identified by their "id" key. Call repack() to rebuild the whole layout
+    from scratch when it has become fragmented; with a LayoutCache, repacks
+    of a job seen before are answered from the cache.
+
+    Example:
+        packer = IncrementalPacker(st.session_state["shelves"])
+        packer.sync(st.session_state["items"], st.session_state["shelves"])
+        for fitted_items, bin_size in packer.placements:
+            ...
+    """
+
+    def __init__(self, shelves: List[Dict], cache: Optional[LayoutCache] = None):
+        self.cache = cache
+        self.bin_sizes = [item_dimensions(shelf) for shelf in shelves]
+        self.packers = [ShelfPacker(bin_size) for bin_size in self.bin_sizes]
+        self.unfitted_items: List[Dict] = []
+
+    @property
+    def placements(self) -> List[Tuple[List[Dict], Tuple[float, float, float]]]:
+        """(fitted_items, bin_size) per shelf, in the format returned by parse_packer_output."""
+        return [(packer.fitted_items, packer.bin_size) for packer in self.packers]
+
+    @property
+    def item_ids(self) -> set:
+        """Ids of every item known to the layout, fitted or not."""
+        ids = {item["id"] for item in self.unfitted_items}
+        for packer in self.packers:
+            ids.update(packer.keys)
+        return ids
+
+    def _place(self, item: Dict, shelves: Optional[List[ShelfPacker]] = None) -> bool:
+        rotations = item_rotations([item])[0]
+        for packer in shelves or self.packers:
+            if packer.place(item["name"], item_dimensions(item), rotations, item["id"]) is not None:
+                return True
+        return False
+
+    def add(self, item: Dict) -> bool:
+        """
+        Place one new item, or every copy of it, into the free space of the current layout.
+
+        Args:
+            item: Item dict with "id", "name", "rotation" and "dimensions"
+
+        Returns:
+            True if every copy was fitted, False if any was added to unfitted_items
+        """
+        fitted = True
+        for copy in expand_items([item]):
+            if not self._place(copy):
+                self.unfitted_items.append(copy)
+                fitted = False
+        return fitted
+
+    def remove(self, item_id) -> bool:
+        """
+        Remove an item and free its space, then try to fit waiting unfitted items there.
+
+        Args:
+            item_id: The "id" of the item to remove
+
+        Returns:
+            True if the item was found
+        """
+        for packer in self.packers:
+            if item_id in packer.keys:
+                packer.remove(packer.keys.index(item_id))
+                self.unfitted_items = [item for item in self.unfitted_items if not self._place(item, [packer])]
+                return True
+
+        count = len(self.unfitted_items)
+        self.unfitted_items = [item for item in self.unfitted_items if item["id"] != item_id]
+        return len(self.unfitted_items) != count
+
+    def repack(self, items: List[Dict]) -> None:
+        """
+        Full repack fallback: rebuild the layout from scratch with pack_shelves.
+
+        Args:
+            items: Item dicts from st.session_state["items"]
+        """
+        shelves = [{"dimensions": bin_size} for bin_size in self.bin_sizes]
+        if self.cache is not None:
+            self.packers, self.unfitted_items = self.cache.pack_shelves(items, shelves)
+        else:
+            self.packers, self.unfitted_items = _pack_shelves(items, shelves)
+            # _pack_shelves drops free space smaller than its smallest item,
+            # which later additions may well fit into
+            for packer in self.packers:
+                packer.set_min_size(0.0)
+
+    def sync(self, items: List[Dict], shelves: List[Dict]) -> None:
+        """
+        Bring the layout up to date with the session-state items and shelves.
+
+        Removed items are freed and new items are placed, in list order. A
+        change to the shelves triggers a full repack.
+
+        Args:
+            items: Item dicts from st.session_state["items"]
+            shelves: Shelf dicts from st.session_state["shelves"]
+        """
+        bin_sizes = [item_dimensions(shelf) for shelf in shelves]
+        if bin_sizes != self.bin_sizes:
+            self.bin_sizes = bin_sizes
+            self.repack(items)
+            return
+
+        items = expand_items(items)
+        known = self.item_ids
+        current = {item["id"] for item in items}
+        for item_id in known - current:
+            self.remove(item_id)
+        for item in items:
+            if item["id"] not in known:
+                self.add(item)
@@ -0,0 +1,178 @@
+import os
+import atexit
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple, Dict, Optional, Sequence
+
+from .engine import ShelfPacker, expand_items, item_dimensions, place_items, sort_by_volume
+from .rotation import item_rotations
+
+# Below this many items the pool overhead outweighs any parallel speedup
+MIN_PARALLEL_ITEMS = 50
+
+_pool = None
+_pool_workers = 0
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Reuse one process pool across Streamlit reruns."""
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = ProcessPoolExecutor(max_workers=workers)
+        _pool_workers = workers
+    return _pool
+
+
+@atexit.register
+def _shutdown_pool() -> None:
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _min_size(items: List[Dict]) -> float:
+    return min((min(item_dimensions(item)) for item in items), default=0.0)
+
+
+def _pack_into(bin_size: Sequence[float],
+               items: List[Dict],
+               min_size: float,
+               rotation_order: Optional[Sequence[int]] = None) -> Tuple[ShelfPacker, List[int]]:
+    """Pack items into one shelf, returning the packer and the indices that did not fit."""
+    packer = ShelfPacker(bin_size, capacity=max(len(items), 1), min_size=min_size, rotation_order=rotation_order)
+    return packer, place_items(packer, items, rotation_order)
+
+
+def _pack_chain(bin_sizes: List[Sequence[float]],
+                items: List[Dict],
+                min_size: float,
+                rotation_order: Optional[Sequence[int]] = None) -> Tuple[List[ShelfPacker], List[int]]:
+    """First-fit: fill each shelf in turn and pass leftovers on to the next one."""
+    packers = []
+    remaining = list(range(len(items)))
+    for bin_size in bin_sizes:
+        packer, failed = _pack_into(bin_size, [items[i] for i in remaining], min_size, rotation_order)
+        remaining = [remaining[i] for i in failed]
+        packers.append(packer)
+    return packers, remaining
+
+
+def _balanced_assignment(items: List[Dict], bin_sizes: List[Sequence[float]]) -> List[List[int]]:
+    """
+    Split items across shelves so that every shelf is filled to a similar fraction of its volume.
+
+    Items are assigned largest first to the least-filled shelf they can fit in.
+    Items too large for every shelf are assigned to the first shelf, where they
+    will be reported as unfitted.
+    """
+    volumes = np.array([np.prod(b) for b in bin_sizes])
+    shelf_keys = np.sort(np.asarray(bin_sizes, dtype=float), axis=1)
+    assigned = np.zeros(len(bin_sizes))
+    groups = [[] for _ in bin_sizes]
+    for i, item in enumerate(items):
+        dims = np.sort(item_dimensions(item))
+        fits = np.all(shelf_keys >= dims, axis=1)
+        if not fits.any():
+            groups[0].append(i)
+            continue
+        fill = np.where(fits, assigned / volumes, np.inf)
+        target = int(np.argmin(fill))
+        groups[target].append(i)
+        assigned[target] += np.prod(dims)
+    return groups
+
+
+def _spill(packers: List[ShelfPacker], items: List[Dict], leftovers: List[int]) -> List[int]:
+    """Try to place leftover items into the free space of any shelf."""
+    remaining = []
+    for i, rotations in zip(leftovers, item_rotations([items[i] for i in leftovers])):
+        item = items[i]
+        for packer in packers:
+            if packer.place(item["name"], item_dimensions(item), rotations, item.get("id")) is not None:
+                break
+        else:
+            remaining.append(i)
+    return remaining
+
+
+def _packed_volume(packers: List[ShelfPacker]) -> float:
+    return sum(packer.used_volume for packer in packers)
+
+
+def pack_shelves(items: List[Dict],
+                 shelves: List[Dict],
+                 workers: Optional[int] = None) -> Tuple[List[Tuple[List[Dict], Tuple[float, float, float]]], List[Dict]]:
+    """
+    Pack session-state items across all session-state shelves.
+
+    Several candidate assignments of items to shelves are evaluated and the one
+    that packs the most volume is kept:
+        - first-fit over the shelves in the order they were added
+        - first-fit over the shelves from largest to smallest
+        - a balanced split by fill fraction, where each shelf is packed
+          independently and leftovers spill into the remaining free space
+
+    Every first-fit chain and every shelf of the balanced split is a separate
+    task in a process pool, so adding shelves adds parallel tasks rather than
+    serial work.
+
+    Args:
+        items: Item dicts from st.session_state["items"]
+        shelves: Shelf dicts from st.session_state["shelves"]
+        workers: Number of worker processes (defaults to the CPU count, 1 packs in-process)
+
+    Returns:
+        Tuple containing:
+            - List of (fitted_items, bin_size) per shelf, in the order of shelves,
+              in the format returned by parse_packer_output
+            - List[Dict]: Items that did not fit in any shelf
+    """
+    packers, unfitted_items = _pack_shelves(items, shelves, workers)
+    placements = [(packer.fitted_items, packer.bin_size) for packer in packers]
+    return placements, unfitted_items
+
+
+def _pack_shelves(items: List[Dict], shelves: List[Dict], workers: Optional[int] = None) -> Tuple[List[ShelfPacker], List[Dict]]:
+    """Same as pack_shelves, but returns the ShelfPacker of each shelf."""
+    if not shelves:
+        return [], list(items)
+
+    items = sort_by_volume(expand_items(items))
+    bin_sizes = [item_dimensions(shelf) for shelf in shelves]
+    min_size = _min_size(items)
+    by_volume = sorted(range(len(shelves)), key=lambda s: np.prod(bin_sizes[s]), reverse=True)
+    groups = _balanced_assignment(items, bin_sizes)
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(items) >= MIN_PARALLEL_ITEMS:
+        pool = _get_pool(workers)
+        submit = pool.submit
+    else:
+        submit = None
+
+    def run(fn, *args):
+        return submit(fn, *args) if submit else fn(*args)
+
+    def result(task):
+        return task.result() if submit else task
+
+    chain = run(_pack_chain, bin_sizes, items, min_size)
+    chain_largest = run(_pack_chain, [bin_sizes[s] for s in by_volume], items, min_size)
+    balanced = [run(_pack_into, bin_sizes[s], [items[i] for i in groups[s]], min_size) for s in range(len(shelves))]
+
+    candidates = [result(chain)]
+
+    packers, leftovers = result(chain_largest)
+    order = np.argsort(by_volume)
+    candidates.append(([packers[s] for s in order], leftovers))
+
+    packers, leftovers = [], []
+    for s, task in enumerate(balanced):
+        packer, failed = result(task)
+        packers.append(packer)
+        leftovers.extend(groups[s][i] for i in failed)
+    candidates.append((packers, _spill(packers, items, sorted(leftovers))))
+
+    packers, leftovers = max(candidates, key=lambda c: _packed_volume(c[0]))
+    return packers, [items[i] for i in leftovers]
@@ -0,0 +1,133 @@
+import numpy as np
+from typing import List, Tuple, Dict, Optional, Sequence
+
+
+class RotationType:
+    """Rotation ids, in the same order as py3dbp's RotationType."""
+    RT_WHD = 0
+    RT_HWD = 1
+    RT_HDW = 2
+    RT_DHW = 3
+    RT_DWH = 4
+    RT_WDH = 5
+
+    ALL = [RT_WHD, RT_HWD, RT_HDW, RT_DHW, RT_DWH, RT_WDH]
+
+    # Rotations that keep the item's height vertical. Only meaningful for items whose
+    # dims[1] is their true height; measured dimensions are sorted, so the app never sets it
+    UPRIGHT = [RT_WHD, RT_DHW]
+
+
+# Axis permutation of each rotation: rotated dims = size[ROTATIONS[rotation]]
+ROTATIONS = np.array([
+    [0, 1, 2],  # Width, Height, Depth
+    [1, 0, 2],  # Height, Width, Depth
+    [1, 2, 0],  # Height, Depth, Width
+    [2, 1, 0],  # Depth, Height, Width
+    [2, 0, 1],  # Depth, Width, Height
+    [0, 2, 1],  # Width, Depth, Height
+])
+
+
+def apply_rotation(size: Sequence[float], rotation: int) -> Tuple[float, float, float]:
+    """
+    Apply rotation to item dimensions.
+
+    Args:
+        size: Original dimensions (width, height, depth)
+        rotation: Rotation type (0-5)
+
+    Returns:
+        Rotated dimensions
+    """
+    return tuple(size[axis] for axis in ROTATIONS[rotation])
+
+
+def distinct_orientations(size: Sequence[float]) -> int:
+    """Number of distinct orientations of a box: 1 for a cube, 3 with two equal sides, else 6."""
+    a, b, c = sorted(size)
+    if a == c:
+        return 1
+    if a == b or b == c:
+        return 3
+    return 6
+
+
+def allowed_rotations(item: Dict) -> np.ndarray:
+    """
+    Boolean mask of the rotations an item may be packed in.
+
+    Items may list "allowed_rotations" explicitly; otherwise a truthy
+    "rotation" flag allows all six and a falsy one only the original
+    orientation.
+    """
+    mask = np.zeros(len(ROTATIONS), dtype=bool)
+    if item.get("allowed_rotations") is not None:
+        mask[list(item["allowed_rotations"])] = True
+    elif item.get("rotation", 1):
+        mask[:] = True
+    else:
+        mask[RotationType.RT_WHD] = True
+    return mask
+
+
+def orientation_table(sizes: np.ndarray,
+                      allowed: Optional[np.ndarray] = None,
+                      order: Optional[Sequence[int]] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Distinct allowed orientations of every item, computed in one pass.
+
+    Rotations that give the same dimensions as an earlier one are dropped, so
+    a cube has one orientation and a square-based box three.
+
+    Args:
+        sizes: (n_items, 3) array of dimensions
+        allowed: (n_items, 6) boolean mask of allowed rotations, all allowed if None
+        order: Rotation ids in preference order, ROTATIONS order if None
+
+    Returns:
+        Tuple containing:
+            - (n_items, k, 3) array of rotated dimensions
+            - (n_items, k) array of rotation ids, -1 for padding
+            - (n_items, k) boolean mask of valid entries
+        where k is the largest number of distinct orientations of any item
+    """
+    sizes = np.asarray(sizes).reshape(-1, 3)
+    n = len(sizes)
+    order = np.arange(len(ROTATIONS)) if order is None else np.asarray(order)
+    if allowed is None:
+        allowed = np.ones((n, len(ROTATIONS)), dtype=bool)
+    allowed = np.asarray(allowed)[:, order]
+
+    dims = sizes[:, ROTATIONS[order]]                                 # (n, 6, 3)
+    same = np.all(dims[:, :, None, :] == dims[:, None, :, :], axis=3)  # (n, 6, 6)
+    earlier = np.tril(np.ones((len(order), len(order)), dtype=bool), k=-1)
+    duplicate = np.any(same & earlier[None] & allowed[:, None, :], axis=2)
+    keep = allowed & ~duplicate
+
+    k = max(int(keep.sum(axis=1).max(initial=0)), 1)
+    # Stable sort moves kept entries to the front in preference order
+    slots = np.argsort(~keep, axis=1, kind="stable")[:, :k]
+    valid = np.take_along_axis(keep, slots, axis=1)
+    ids = np.where(valid, order[slots], -1)
+    table = np.take_along_axis(dims, slots[:, :, None], axis=1)
+    return table, ids, valid
+
+
+def item_rotations(items: List[Dict], order: Optional[Sequence[int]] = None) -> List[np.ndarray]:
+    """
+    Distinct allowed rotation ids of each session-state item, in preference order.
+
+    Args:
+        items: Item dicts with "dimensions" and optionally "rotation" or "allowed_rotations"
+        order: Rotation ids in preference order, ROTATIONS order if None
+
+    Returns:
+        One array of rotation ids per item
+    """
+    if not items:
+        return []
+    sizes = np.array([[float(d) for d in item["dimensions"]] for item in items])
+    allowed = np.array([allowed_rotations(item) for item in items])
+    _, ids, valid = orientation_table(sizes, allowed, order)
+    return [row[mask] for row, mask in zip(ids, valid)]
@@ -0,0 +1,165 @@
+import os
+import sys
+import time
+import numpy as np
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import List, Tuple, Dict, Optional, Callable, Sequence
+
+from .engine import ROTATIONS, ShelfPacker, expand_items, item_dimensions
+from .multibin import MIN_PARALLEL_ITEMS, _get_pool, _min_size, _pack_chain
+
+# Candidates evaluated per worker task, to amortize inter-process overhead
+BATCH_SIZE = 4
+
+# Utilization differences below this are treated as ties
+SCORE_EPS = 1e-9
+
+# Deterministic orderings tried before any randomized ones
+SORT_KEYS = [
+    lambda dims: np.prod(dims),             # volume
+    lambda dims: max(dims),                 # longest side
+    lambda dims: np.prod(sorted(dims)[1:]),  # largest face
+    lambda dims: dims[1],                   # height
+]
+
+
+def candidate(items: List[Dict], seed: int, index: int) -> Tuple[List[int], Sequence[int]]:
+    """
+    Item order and rotation preference for one candidate of the search.
+
+    The first candidates are deterministic sort orders with the default
+    rotation preference. Later ones are seeded from (seed, index), so a given
+    seed and index always produce the same candidate.
+
+    Args:
+        items: Item dicts from st.session_state["items"]
+        seed: Search seed
+        index: Candidate number
+
+    Returns:
+        Tuple of item indices in packing order and rotation indices in preference order
+    """
+    dims = [item_dimensions(item) for item in items]
+    if index < len(SORT_KEYS):
+        key = SORT_KEYS[index]
+        order = sorted(range(len(items)), key=lambda i: key(dims[i]), reverse=True)
+        return order, list(range(len(ROTATIONS)))
+
+    rng = np.random.default_rng([seed, index])
+    volumes = np.prod(np.asarray(dims).reshape(-1, 3), axis=1)
+    if rng.random() < 0.5:
+        # Volume order with multiplicative noise keeps large items early
+        noisy = volumes * rng.lognormal(0.0, 0.3, len(items))
+        order = list(np.argsort(-noisy, kind="stable"))
+    else:
+        order = list(rng.permutation(len(items)))
+    return [int(i) for i in order], [int(r) for r in rng.permutation(len(ROTATIONS))]
+
+
+def _evaluate(items: List[Dict], bin_sizes: List[Sequence[float]], seed: int, indices: Sequence[int], deadline: float):
+    """Evaluate a batch of candidates until the deadline and return the best one."""
+    min_size = _min_size(items)
+    total = float(sum(np.prod(b) for b in bin_sizes))
+    best = None
+    for index in indices:
+        if best is not None and time.time() > deadline:
+            break
+        order, rotation_order = candidate(items, seed, index)
+        packers, leftovers = _pack_chain(bin_sizes, [items[i] for i in order], min_size, rotation_order)
+        score = sum(packer.used_volume for packer in packers) / total
+        if best is None or score > best[1] + SCORE_EPS:
+            best = (index, score, packers, [order[i] for i in leftovers])
+    return best
+
+
+def search_pack(items: List[Dict],
+                shelves: List[Dict],
+                budget: float = 2.0,
+                seed: int = 0,
+                workers: Optional[int] = None,
+                max_candidates: Optional[int] = None,
+                on_improve: Optional[Callable] = None) -> Tuple[List[Tuple[List[Dict], Tuple[float, float, float]]], List[Dict], float]:
+    """
+    Multi-start packing search across worker processes.
+
+    Candidate item orders and rotation preferences are packed first-fit over
+    the shelves until the wall-clock budget runs out, and the layout with the
+    highest volume utilization is kept. Ties go to the lower candidate index.
+    With a fixed seed every candidate is reproducible; pass max_candidates to
+    make the whole search independent of machine speed.
+
+    Args:
+        items: Item dicts from st.session_state["items"]
+        shelves: Shelf dicts from st.session_state["shelves"]
+        budget: Wall-clock budget in seconds
+        seed: Seed for the randomized candidates
+        workers: Number of worker processes (defaults to the CPU count, 1 searches in-process)
+        max_candidates: Stop after this many candidates even if budget remains, at least 1
+        on_improve: Called as on_improve(placements, unfitted_items, utilization)
+            every time a better layout is found
+
+    Returns:
+        Tuple containing:
+            - List of (fitted_items, bin_size) per shelf, in the order of shelves
+            - List[Dict]: Items that did not fit in any shelf
+            - float: Volume utilization of the returned layout
+    """
+    packers, unfitted_items, score = _search(items, shelves, budget, seed, workers, max_candidates, on_improve)
+    placements = [(packer.fitted_items, packer.bin_size) for packer in packers]
+    return placements, unfitted_items, score
+
+
+def _search(items: List[Dict],
+            shelves: List[Dict],
+            budget: float = 2.0,
+            seed: int = 0,
+            workers: Optional[int] = None,
+            max_candidates: Optional[int] = None,
+            on_improve: Optional[Callable] = None) -> Tuple[List[ShelfPacker], List[Dict], float]:
+    """Same as search_pack, but returns the ShelfPacker of each shelf."""
+    if max_candidates is not None and max_candidates < 1:
+        raise ValueError(f"max_candidates must be at least 1, got {max_candidates}.")
+    items = expand_items(items)
+    if not shelves:
+        return [], items, 0.0
+
+    bin_sizes = [item_dimensions(shelf) for shelf in shelves]
+    deadline = time.time() + budget
+    limit = max_candidates if max_candidates is not None else sys.maxsize
+    best = None
+    next_index = 0
+
+    def consider(result):
+        nonlocal best
+        improved = best is None or result[1] > best[1] + SCORE_EPS
+        if improved or (result[1] > best[1] - SCORE_EPS and result[0] < best[0]):
+            best = result
+            if improved and on_improve is not None:
+                _, score, packers, leftovers = best
+                placements = [(packer.fitted_items, packer.bin_size) for packer in packers]
+                on_improve(placements, [items[i] for i in leftovers], score)
+
+    def batch():
+        nonlocal next_index
+        indices = range(next_index, min(next_index + BATCH_SIZE, limit))
+        next_index = indices.stop
+        return indices
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(items) >= MIN_PARALLEL_ITEMS:
+        pool = _get_pool(workers)
+        pending = set()
+        while True:
+            while len(pending) < workers and next_index < limit and (next_index == 0 or time.time() < deadline):
+                pending.add(pool.submit(_evaluate, items, bin_sizes, seed, batch(), deadline))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for task in done:
+                consider(task.result())
+    else:
+        while next_index < limit and (next_index == 0 or time.time() < deadline):
+            consider(_evaluate(items, bin_sizes, seed, batch(), deadline))
+
+    _, score, packers, leftovers = best
+    return packers, [items[i] for i in leftovers], score
@@ -1,13 +1,14 @@
 import plotly.graph_objects as go
-from decimal import Decimal
-from typing import List, Tuple, Dict, Union
+from typing import List, Tuple, Dict
 
-def create_cuboid(x: Union[float, Decimal], 
-                 y: Union[float, Decimal], 
-                 z: Union[float, Decimal],
-                 dx: Union[float, Decimal], 
-                 dy: Union[float, Decimal], 
-                 dz: Union[float, Decimal], 
+from packing.rotation import apply_rotation
+
+def create_cuboid(x: float, 
+                 y: float, 
+                 z: float,
+                 dx: float, 
+                 dy: float, 
+                 dz: float, 
                  color: str) -> go.Mesh3d:
     """
     Create a 3D cuboid mesh using triangular faces.
@@ -47,28 +48,44 @@ def create_cuboid(x: Union[float, Decimal],
         opacity=0.7
     )
 
-def apply_rotation(size: Tuple[float, float, float], rotation: int) -> Tuple[float, float, float]:
+def create_packing_figure(fitted_items: List[Dict],
+                          bin_size: Tuple[float, float, float],
+                          colors: List[str],
+                          title: str = "Packed Layout") -> go.Figure:
     """
-    Apply rotation to item dimensions.
+    Create a single figure showing all given items in the container.
     
     Args:
-        size: Original dimensions (width, height, depth)
-        rotation: Rotation type (0-5)
+        fitted_items: List of dictionaries containing item information
+        bin_size: Dimensions of the container (width, height, depth)
+        colors: List of colors for items
+        title: Figure title
     
     Returns:
-        Rotated dimensions
+        plotly figure of the packed container
     """
-    if rotation == 1:  # Rotate Height and Width
-        return (size[1], size[0], size[2])
-    elif rotation == 2:  # Rotate Height and Depth
-        return (size[0], size[2], size[1])
-    elif rotation == 3:  # Rotate Depth and Height
-        return (size[2], size[0], size[1])
-    elif rotation == 4:  # Rotate Depth and Width
-        return (size[2], size[1], size[0])
-    elif rotation == 5:  # Rotate Width and Depth
-        return (size[1], size[2], size[0])
-    return size
+    fig = go.Figure()
+    
+    # Draw container
+    fig.add_trace(create_cuboid(0, 0, 0, *bin_size, "lightgray"))
+    
+    # Add items
+    for i, item in enumerate(fitted_items):
+        pos = item["position"]
+        size = apply_rotation(item["size"], item["rotation"])
+        
+        fig.add_trace(create_cuboid(*pos, *size, colors[i % len(colors)]))
+    
+    fig.update_layout(
+        scene=dict(
+            xaxis=dict(range=[0, bin_size[0]], title="Width"),
+            yaxis=dict(range=[0, bin_size[1]], title="Height"),
+            zaxis=dict(range=[0, bin_size[2]], title="Depth"),
+        ),
+        title=title
+    )
+    
+    return fig
 
 def create_packing_visualization(fitted_items: List[Dict], 
                                bin_size: Tuple[float, float, float],
@@ -84,36 +101,11 @@ def create_packing_visualization(fitted_items: List[Dict],
     Returns:
         List of plotly figures representing packing steps
     """
-    frames = []
-    for step, item in enumerate(fitted_items):
-        fig = go.Figure()
-        
-        # Draw container
-        fig.add_trace(create_cuboid(0, 0, 0, *bin_size, "lightgray"))
-        
-        # Add items up to current step
-        for i in range(step + 1):
-            pos = fitted_items[i]["position"]
-            size = apply_rotation(fitted_items[i]["size"], fitted_items[i]["rotation"])
-            
-            fig.add_trace(create_cuboid(
-                *map(Decimal, pos),
-                *map(Decimal, size),
-                colors[i]
-            ))
-        
-        fig.update_layout(
-            scene=dict(
-                xaxis=dict(range=[0, bin_size[0]], title="Width"),
-                yaxis=dict(range=[0, bin_size[1]], title="Height"),
-                zaxis=dict(range=[0, bin_size[2]], title="Depth"),
-            ),
-            title=f"Step {step + 1}: Packing {item['name']}"
-        )
-        
-        frames.append(fig)
-    
-    return frames
+    return [
+        create_packing_figure(fitted_items[:step + 1], bin_size, colors,
+                              title=f"Step {step + 1}: Packing {item['name']}")
+        for step, item in enumerate(fitted_items)
+    ]
 
 
 def parse_packer_output(packer) -> Tuple[List[Dict], Tuple[float, float, float]]:
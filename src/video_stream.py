@@ -0,0 +1,243 @@
+import time
+
+import cv2
+import numpy as np
+from imutils import perspective
+from scipy.optimize import linear_sum_assignment
+
+import detect_objects as dobj
+
+# Run full contour detection every this many frames, and track boxes in between
+KEYFRAME_INTERVAL = 10
+
+# Weight of the newest measurement in the exponential moving average of each object's dimensions
+SMOOTHING = 0.2
+
+# Keyframes are detected on frames downscaled to this long side
+STREAM_MAX_SIDE = 640
+
+LK_PARAMS = dict(
+    winSize=(21, 21), maxLevel=3, criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03)
+)
+
+
+def iter_frames(source):
+    """
+    Yield BGR frames from a video file or a local webcam.
+
+    Args:
+        source (str or int): Path of a video file, or the index of a webcam.
+
+    Yields:
+        numpy.ndarray: One frame at a time, until the source runs out.
+    """
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video source {source!r}.")
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                return
+            yield frame
+    finally:
+        capture.release()
+
+
+def box_dims(corners):
+    """
+    Pixel dimensions and centroid x of boxes, as measured by detect_objects.get_dims.
+
+    Args:
+        corners (numpy.ndarray): (n, 4, 2) ordered corners (tl, tr, br, bl) of each box.
+
+    Returns:
+        numpy.ndarray: (n, 3) rows of (dA, dB, cX).
+    """
+    tl, tr, br, bl = (corners[:, k] for k in range(4))
+    dA = np.linalg.norm((tl + tr) / 2 - (bl + br) / 2, axis=1)
+    dB = np.linalg.norm((tl + bl) / 2 - (tr + br) / 2, axis=1)
+    return np.column_stack([dA, dB, corners[:, :, 0].mean(axis=1)])
+
+
+class StreamMeasurer:
+    """
+    Measure the objects in a stream of frames from one camera at interactive rates.
+
+    Full contour detection runs only on keyframes. In between, the corners of
+    each object's box are tracked with pyramidal Lucas-Kanade optical flow,
+    which costs a fraction of a detection. A keyframe is forced early when a
+    corner is lost. Each object keeps a track id across keyframes, and its
+    pixel dimensions are smoothed with an exponential moving average, so the
+    measurements stay stable despite per-frame jitter.
+
+    As in detect_objects.get_objects, the rightmost object is the reference.
+    A single camera sees one view, so objects get two dimensions.
+    """
+
+    def __init__(self, keyframe_interval=KEYFRAME_INTERVAL, smoothing=SMOOTHING, max_side=STREAM_MAX_SIDE):
+        self.keyframe_interval = keyframe_interval
+        self.smoothing = smoothing
+        self.max_side = max_side
+        self.frame_index = 0
+        self.keyframes = 0
+        self._since_keyframe = None
+        self._grey = None
+        self._corners = np.empty((0, 4, 2), dtype=np.float32)
+        self._track_ids = np.empty(0, dtype=int)
+        self._smoothed = {}
+        self._next_track_id = 0
+
+    def _detect(self, frame):
+        """Ordered box corners of every object in a keyframe."""
+        prep = dobj.preprocess(frame, max_side=self.max_side, refine=None)
+        corners = [
+            perspective.order_points(cv2.boxPoints(cv2.minAreaRect(c)))
+            for c in dobj.object_contours(prep["contours"], frame.shape)
+        ]
+        return prep["grey"], np.array(corners, dtype=np.float32).reshape(-1, 4, 2)
+
+    def _assign_tracks(self, corners):
+        """Carry track ids over to the boxes of a new keyframe by nearest centroid."""
+        ids = np.full(len(corners), -1)
+        if len(corners) and len(self._corners):
+            new_centres = corners.mean(axis=1)
+            old_centres = self._corners.mean(axis=1)
+            cost = np.linalg.norm(new_centres[:, None] - old_centres[None], axis=2)
+            rows, cols = linear_sum_assignment(cost)
+            # Boxes that moved further than their own size are new objects
+            size = np.linalg.norm(corners[:, 0] - corners[:, 2], axis=1)
+            keep = cost[rows, cols] < size[rows]
+            ids[rows[keep]] = self._track_ids[cols[keep]]
+        for i in np.flatnonzero(ids < 0):
+            ids[i] = self._next_track_id
+            self._next_track_id += 1
+        self._smoothed = {k: v for k, v in self._smoothed.items() if k in set(ids.tolist())}
+        return ids
+
+    def _track(self, grey):
+        """Move the boxes along with the optical flow of their corners, False if a corner was lost."""
+        if not len(self._corners):
+            return True
+        points = self._corners.reshape(-1, 1, 2)
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(self._grey, grey, points, None, **LK_PARAMS)
+        if moved is None or not status.all():
+            return False
+        self._corners = moved.reshape(-1, 4, 2)
+        return True
+
+    def process(self, frame):
+        """
+        Measure the objects in the next frame of the stream.
+
+        Args:
+            frame (numpy.ndarray): BGR frame.
+
+        Returns:
+            dict: "frame_index", whether it was a "keyframe", the "track_ids",
+            box "corners" and smoothed pixel "dims" (dA, dB) of every object
+            from left to right, with the reference last.
+        """
+        keyframe = self._since_keyframe is None or self._since_keyframe + 1 >= self.keyframe_interval
+        if not keyframe:
+            grey = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            keyframe = not self._track(grey)
+        if keyframe:
+            grey, corners = self._detect(frame)
+            self._track_ids = self._assign_tracks(corners)
+            self._corners = corners
+            self._since_keyframe = 0
+            self.keyframes += 1
+        else:
+            self._since_keyframe += 1
+        self._grey = grey
+
+        measured = box_dims(self._corners)
+        order = np.argsort(measured[:, 2], kind="stable")
+        dims = []
+        for i in order:
+            track_id = int(self._track_ids[i])
+            previous = self._smoothed.get(track_id)
+            current = measured[i, :2]
+            self._smoothed[track_id] = current if previous is None else previous + self.smoothing * (current - previous)
+            dims.append(self._smoothed[track_id])
+
+        result = {
+            "frame_index": self.frame_index,
+            "keyframe": keyframe,
+            "track_ids": self._track_ids[order],
+            "corners": self._corners[order],
+            "dims": np.array(dims).reshape(-1, 2),
+        }
+        self.frame_index += 1
+        return result
+
+    def real_dimensions(self, result, ref_real):
+        """
+        Real-world dimensions of the measured objects from one view.
+
+        Args:
+            result (dict): Output of process.
+            ref_real (tuple): Real-world (width, length) of the reference in this view.
+
+        Returns:
+            numpy.ndarray: (n, 2) dimensions of the objects left of the reference,
+            rounded to 0.1 mm, or an empty array without a reference and an object.
+        """
+        dims = result["dims"]
+        if len(dims) < 2:
+            return np.empty((0, 2))
+        scale = np.asarray(ref_real, dtype=float) / dims[-1]
+        return np.round(dims[:-1] * scale, dobj.DIMENSION_DECIMALS)
+
+
+def measure_stream(source, ref_real=None, max_frames=None, **kwargs):
+    """
+    Measure a whole video file or webcam stream, reporting throughput.
+
+    Args:
+        source (str or int): Video file path or webcam index.
+        ref_real (tuple, optional): Real-world (width, length) of the reference,
+            to report real dimensions from the last frame.
+        max_frames (int, optional): Stop after this many frames, e.g. for a webcam.
+        **kwargs: StreamMeasurer settings.
+
+    Returns:
+        dict: "frames", "keyframes", "seconds", "fps" and the "last" process result,
+        with its "real" dimensions if ref_real was given.
+    """
+    measurer = StreamMeasurer(**kwargs)
+    result = None
+    start = time.perf_counter()
+    for frame in iter_frames(source):
+        result = measurer.process(frame)
+        if max_frames and measurer.frame_index >= max_frames:
+            break
+    seconds = time.perf_counter() - start
+    if result is not None and ref_real is not None:
+        result["real"] = measurer.real_dimensions(result, ref_real)
+    return {
+        "frames": measurer.frame_index,
+        "keyframes": measurer.keyframes,
+        "seconds": seconds,
+        "fps": measurer.frame_index / seconds if seconds else 0.0,
+        "last": result,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure objects in a video file or webcam stream.")
+    parser.add_argument("source", help="Video file path, or a webcam index such as 0")
+    parser.add_argument("--keyframe-interval", type=int, default=KEYFRAME_INTERVAL)
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--ref", type=float, nargs=2, default=(5.5, 5.5), help="Reference width and length in cm")
+    args = parser.parse_args()
+
+    source = int(args.source) if args.source.isdigit() else args.source
+    stats = measure_stream(source, ref_real=args.ref, max_frames=args.max_frames,
+                           keyframe_interval=args.keyframe_interval)
+    print(f"{stats['frames']} frames, {stats['keyframes']} keyframes, {stats['fps']:.1f} fps")
+    if stats["last"] is not None:
+        print(f"Object dims (real-world): {stats['last']['real'].tolist()} cm")
@@ -0,0 +1,195 @@
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import calibration
+import detect_objects as dobj
+
+
+def upload_key(top_bytes, front_bytes, **params):
+    """
+    Content hash of an item's photo pair and the detection parameters.
+
+    Args:
+        top_bytes (bytes): Encoded top-view upload.
+        front_bytes (bytes): Encoded front-view upload.
+        **params: Any setting that changes the detection result, e.g. max_side.
+
+    Returns:
+        str: Hex digest identifying the measurement.
+    """
+    digest = hashlib.sha256()
+    for data in (top_bytes, front_bytes):
+        digest.update(hashlib.sha256(data).digest())
+    digest.update(json.dumps(params, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def entry_size(entry):
+    """Bytes held by the arrays of a cache entry; crops that are views into a photo are not counted twice."""
+    arrays = [value for value in entry.values() if isinstance(value, np.ndarray)]
+    arrays += entry.get("crops") or []
+    return sum(array.nbytes for array in arrays if array.base is None)
+
+
+def _calibrated_or_error(top_bytes, front_bytes, calibrations, max_side):
+    """Decode and measure one calibrated pair, as detect_objects._measure_or_error does for the reference flow."""
+    try:
+        im_td, im_side = dobj.decode_image(top_bytes), dobj.decode_image(front_bytes)
+        top_calibration = calibrations.get("top", im_td.shape)
+        front_calibration = calibrations.get("front", im_side.shape)
+        if top_calibration is None or front_calibration is None:
+            return {"calibrated": False, "error": None}
+        obj_real, crops = calibration.measure_calibrated(im_td, im_side, top_calibration, front_calibration, max_side)
+        return {"crops": crops, "obj_real": obj_real, "error": None}
+    except ValueError as e:
+        return {"error": str(e)}
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+class VisionCache:
+    """
+    LRU cache of decoded photos, crops, labels and pixel measurements per item.
+
+    Entries are keyed by upload_key, so editing the reference dimensions, or
+    any other rerun with the same uploads, skips decoding, detection and
+    labeling; only get_real_dimensions has to run again. Least recently used
+    entries are evicted once the arrays held exceed max_bytes.
+    """
+
+    def __init__(self, max_bytes=512 * 1024 ** 2, max_entries=64):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        # Shared by every session through st.cache_resource
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Look up an entry, counting the hit or miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, entry):
+        """Store an entry, evicting the least recently used ones over the limits."""
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= entry_size(self._entries.pop(key))
+            self._entries[key] = entry
+            self.nbytes += entry_size(entry)
+            # Always keep the newest entry, even if it alone is over the cap
+            while len(self._entries) > 1 and (self.nbytes > self.max_bytes or len(self._entries) > self.max_entries):
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= entry_size(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+            self.hits = self.misses = 0
+
+    def measure_batch(self, pairs, label_fn, max_side=None, multi=False):
+        """
+        Decode, crop, label and measure many photo pairs, computing only the uncached ones.
+
+        Misses are measured concurrently with detect_objects.measure_batch and
+        then all their crops are labeled in one batch. Failed pairs are cached
+        with their error too, since the same uploads would fail the same way.
+
+        Args:
+            pairs (list): (top_bytes, front_bytes) encoded uploads per item.
+            label_fn (callable): Labels a list of crops, returning (label, confidence)
+                pairs in order, e.g. object_labeling.label_images.
+            max_side (int, optional): Pyramid mode setting passed to detect_objects.preprocess.
+            multi (bool, optional): Measure every object in each pair, see detect_objects.measure_pair.
+
+        Returns:
+            list: Per pair, in order, a dict with "image_top", "image_front", "crop", "label", its "confidence",
+            the reference and object pixel dimensions "ref_px" and "obj_px" as returned by
+            get_objects, and an "error" message that is None on success. With multi,
+            "crops", "labels" and "confidences" hold one entry per object and "obj_px" is an (n, 3) array.
+        """
+        keys = [upload_key(top, front, max_side=max_side, multi=multi) for top, front in pairs]
+        entries = [self.get(key) for key in keys]
+        missing = [i for i, entry in enumerate(entries) if entry is None]
+
+        measured = dobj.measure_batch(
+            [pairs[i][0] for i in missing], [pairs[i][1] for i in missing], max_side=max_side, multi=multi
+        )
+        ok = [entry for entry in measured if entry["error"] is None]
+        crops = [crop for entry in ok for crop in (entry["crops"] if multi else [entry["crop"]])]
+        labeled = iter(label_fn(crops))
+        for entry in ok:
+            if multi:
+                entry["labels"], entry["confidences"] = [], []
+                for _ in entry["crops"]:
+                    label, confidence = next(labeled)
+                    entry["labels"].append(label)
+                    entry["confidences"].append(confidence)
+            else:
+                entry["label"], entry["confidence"] = next(labeled)
+
+        for i, entry in zip(missing, measured):
+            if entry["error"] is not None:
+                entry["label"] = None
+            self.put(keys[i], entry)
+            entries[i] = entry
+        return entries
+
+    def measure_calibrated_batch(self, pairs, label_fn, calibrations, max_side=None):
+        """
+        Measure every object in many photo pairs from calibrated cameras, without a reference.
+
+        A calibration only holds for photos of the size it was made at, so
+        pairs with a photo of another size are measured with the reference
+        instead, as measure_batch does with multi.
+
+        Args:
+            pairs (list): (top_bytes, front_bytes) encoded uploads per photo pair.
+            label_fn (callable): Labels a list of crops, as in measure_batch.
+            calibrations (calibration.CalibrationCache): Calibrations of the "top" and "front" cameras.
+            max_side (int, optional): Pyramid mode setting passed to detect_objects.preprocess.
+
+        Returns:
+            list: Per pair, in order, a dict with the "crops", their "labels" and "confidences", the (n, 3)
+            real-world dimensions "obj_real" and an "error" message that is None on success. Pairs
+            measured with the reference get the measure_batch entry instead, without "obj_real".
+        """
+        cameras = [calibrations.get(camera) for camera in ("top", "front")]
+        fingerprint = [c.homography.ravel().round(9).tolist() + list(c.shape) for c in cameras if c is not None]
+        entries = []
+        for top, front in pairs:
+            key = upload_key(top, front, max_side=max_side, calibration=fingerprint)
+            entry = self.get(key)
+            if entry is None:
+                entry = _calibrated_or_error(top, front, calibrations, max_side)
+                if entry["error"] is None and "crops" in entry:
+                    labeled = label_fn(entry["crops"])
+                    entry["labels"] = [label for label, _ in labeled]
+                    entry["confidences"] = [confidence for _, confidence in labeled]
+                self.put(key, entry)
+            entries.append(entry)
+
+        uncalibrated = [i for i, entry in enumerate(entries) if entry.get("calibrated") is False]
+        measured = self.measure_batch([pairs[i] for i in uncalibrated], label_fn, max_side, multi=True)
+        for i, entry in zip(uncalibrated, measured):
+            entries[i] = entry
+        return entries
+
+    def measure(self, top_bytes, front_bytes, label_fn, max_side=None, multi=False):
+        """Single-pair measure_batch."""
+        return self.measure_batch([(top_bytes, front_bytes)], label_fn, max_side, multi)[0]
@@ -0,0 +1,107 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import object_labeling as labeling
+
+IMAGES = os.path.join(os.path.dirname(__file__), "..", "assets", "images_to_label")
+
+
+def timed(fn, repeat):
+    """Median wall time of fn over repeat runs, and its last result."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)), result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check each labeling backend and the model cascade against fp32 base-model labels on "
+                    "assets/images_to_label, and time them."
+    )
+    parser.add_argument("--backends", nargs="+", choices=labeling.BACKENDS, default=list(labeling.BACKENDS))
+    parser.add_argument("--batch-size", type=int, default=labeling.LABEL_BATCH_SIZE)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--cascade", type=float, nargs="*", default=[0.3, labeling.CASCADE_THRESHOLD, 0.7, 0.9],
+                        help="Confidence thresholds to evaluate the small-model cascade at")
+    parser.add_argument("--min-agreement", type=float, default=0.9,
+                        help="Fail if a backend agrees with fp32 on fewer than this share of the images")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    paths = sorted(p for p in glob.glob(os.path.join(IMAGES, "*")) if p.lower().endswith((".jpeg", ".jpg", ".png")))
+    reference = [label for label, _ in labeling.label_images(paths, backend="fp32", num_threads=args.threads)]
+
+    results = []
+    failed = []
+    print(f"{'backend':<14}{'load (s)':>10}{'single (ms)':>13}{'batched (ms/img)':>18}{'agreement':>11}")
+    for backend in args.backends:
+        start = time.perf_counter()
+        labeling.get_model(backend=backend)
+        load = time.perf_counter() - start
+
+        single, _ = timed(lambda: labeling.label_images(paths[:1], backend=backend, num_threads=args.threads),
+                          args.repeat)
+        batched, labeled = timed(
+            lambda: labeling.label_images(paths, batch_size=args.batch_size, backend=backend, num_threads=args.threads),
+            args.repeat,
+        )
+        labels = [label for label, _ in labeled]
+        agreement = float(np.mean([a == b for a, b in zip(labels, reference)]))
+        run = {
+            "backend": backend,
+            "load_s": load,
+            "single_ms": single * 1000,
+            "batched_ms_per_image": batched * 1000 / len(paths),
+            "agreement": agreement,
+            "labels": dict(zip(map(os.path.basename, paths), labels)),
+        }
+        results.append(run)
+        if agreement < args.min_agreement:
+            failed.append(backend)
+        print(f"{backend:<14}{load:>10.2f}{run['single_ms']:>13.1f}{run['batched_ms_per_image']:>18.1f}"
+              f"{agreement:>11.0%}")
+
+    # Cascade: share of crops escalated, and latency and agreement against the base model alone
+    cascade = []
+    if args.cascade:
+        labeling.get_model(labeling.SMALL_MODEL_NAME)
+        base_time, _ = timed(lambda: labeling.label_images(paths, args.batch_size, args.threads), args.repeat)
+        print(f"\n{'threshold':<12}{'escalated':>11}{'ms/img':>10}{'saved':>9}{'agreement':>11}")
+        for threshold in args.cascade:
+            before = dict(labeling.cascade_stats)
+            cascade_time, labeled = timed(
+                lambda: labeling.label_cascade(paths, threshold, args.batch_size, args.threads), args.repeat
+            )
+            escalated = (labeling.cascade_stats["escalated"] - before["escalated"]) / \
+                (labeling.cascade_stats["crops"] - before["crops"])
+            agreement = float(np.mean([label == ref for (label, _), ref in zip(labeled, reference)]))
+            run = {
+                "threshold": threshold,
+                "escalated": escalated,
+                "ms_per_image": cascade_time * 1000 / len(paths),
+                "saved": 1 - cascade_time / base_time,
+                "agreement": agreement,
+            }
+            cascade.append(run)
+            print(f"{threshold:<12.2f}{escalated:>11.0%}{run['ms_per_image']:>10.1f}{run['saved']:>9.0%}"
+                  f"{agreement:>11.0%}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"images": len(paths), "batch_size": args.batch_size, "results": results,
+                       "cascade": cascade}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if failed:
+        print(f"Labels differ from fp32 beyond --min-agreement for: {', '.join(failed)}")
+        sys.exit(1)
@@ -1,32 +1,10 @@
+import os
+import sys
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d.art3d import Poly3DCollection
 
-# Rotation Type Definitions
-class RotationType:
-    RT_WHD = 0
-    RT_HWD = 1
-    RT_HDW = 2
-    RT_DHW = 3
-    RT_DWH = 4
-    RT_WDH = 5
-
-    ALL = [RT_WHD, RT_HWD, RT_HDW, RT_DHW, RT_DWH, RT_WDH]
-
-# Function to apply rotation to dimensions
-def apply_rotation(size, rotation):
-    width, height, depth = size
-    if rotation == RotationType.RT_WHD:
-        return [width, height, depth]
-    elif rotation == RotationType.RT_HWD:
-        return [height, width, depth]
-    elif rotation == RotationType.RT_HDW:
-        return [height, depth, width]
-    elif rotation == RotationType.RT_DHW:
-        return [depth, height, width]
-    elif rotation == RotationType.RT_DWH:
-        return [depth, width, height]
-    elif rotation == RotationType.RT_WDH:
-        return [width, depth, height]
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from packing.rotation import RotationType, apply_rotation
 
 # Dimensions of the large box
 box_dimensions = [8.0, 12.0, 5.5]
@@ -0,0 +1,174 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import tracemalloc
+import numpy as np
+from py3dbp import Packer, Bin, Item
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from packing import pack_shelf, search_pack
+from packing.heightmap import pack_heightmap
+from packing.exact import MAX_EXACT_ITEMS, pack_exact
+
+SIZES = [10, 100, 1000, 10000]
+MIXES = ["cubes", "flat", "long", "mixed", "skus"]
+
+# Share of the total item volume the shelf can hold, so that some items are left over
+SHELF_FILL = 0.8
+
+
+def item_shapes(rng, n, mix):
+    """(n, 3) item dimensions in cm for one of the MIXES."""
+    if mix == "cubes":
+        return np.repeat(rng.uniform(2.0, 8.0, (n, 1)), 3, axis=1)
+    if mix == "flat":
+        dims = np.column_stack([rng.uniform(5.0, 15.0, n), rng.uniform(0.5, 2.0, n), rng.uniform(5.0, 15.0, n)])
+    elif mix == "long":
+        dims = np.column_stack([rng.uniform(15.0, 40.0, n), rng.uniform(1.5, 4.0, n), rng.uniform(1.5, 4.0, n)])
+    else:
+        parts = [item_shapes(rng, len(part), m) for part, m in zip(np.array_split(np.arange(n), 3), ["cubes", "flat", "long"])]
+        dims = np.concatenate(parts)
+        rng.shuffle(dims)
+        return dims
+    # Flat and long items come in random orientations
+    return np.array([rng.permutation(d) for d in dims])
+
+
+def random_items(n, mix="mixed", seed=0):
+    """
+    Seeded packing instance of n items and a shelf sized to hold most of them.
+
+    The "skus" mix has n items spread as quantities over a handful of SKUs.
+    """
+    rng = np.random.default_rng([seed, n, MIXES.index(mix)])
+    if mix == "skus":
+        skus = min(5, n)
+        dims = item_shapes(rng, skus, "mixed")
+        quantities = np.bincount(rng.integers(0, skus, n - skus), minlength=skus) + 1
+        items = [
+            {"id": i, "name": f"SKU {i + 1}", "rotation": 1, "dimensions": [round(float(d), 1) for d in dims[i]],
+             "quantity": int(quantities[i])}
+            for i in range(skus)
+        ]
+        total = float(np.sum(np.prod(dims, axis=1) * quantities))
+    else:
+        dims = item_shapes(rng, n, mix)
+        items = [
+            {"id": i, "name": f"Item {i + 1}", "rotation": 1, "dimensions": [round(float(d), 1) for d in dims[i]]}
+            for i in range(n)
+        ]
+        total = float(np.sum(np.prod(dims, axis=1)))
+
+    # Shelf with the proportions of the app's Large preset, large enough for every item:
+    # its width, height and depth must cover each item's longest, shortest and middle side
+    proportions = np.array([1.0, 0.6, 0.8])
+    scale = (SHELF_FILL * total / np.prod(proportions)) ** (1 / 3)
+    shortest, middle, longest = np.sort(dims, axis=1).max(axis=0)
+    shelf = np.maximum(proportions * scale, [longest, shortest, middle])
+    return items, {"rotation": 0, "dimensions": [round(float(d), 1) for d in shelf]}
+
+
+def count_items(items):
+    return sum(item.get("quantity", 1) for item in items)
+
+
+def run_py3dbp(items, shelf):
+    packer = Packer()
+    packer.add_bin(Bin('shelf', *map(float, shelf['dimensions']), 1e12))
+    for item in items:
+        for _ in range(item.get('quantity', 1)):
+            packer.add_item(Item(item['name'], *map(float, item['dimensions']), 1))
+    packer.pack()
+    fitted = packer.bins[0].items
+    return sum(float(i.get_volume()) for i in fitted), count_items(items) - len(fitted)
+
+
+def run_extreme_points(items, shelf):
+    packer = pack_shelf(items, shelf)
+    return packer.used_volume, len(packer.unfitted_items)
+
+
+def run_search(items, shelf):
+    placements, unfitted_items, _ = search_pack(items, [shelf], budget=2.0, workers=1)
+    return fitted_volume(placements[0][0]), len(unfitted_items)
+
+
+def run_heightmap(items, shelf):
+    placements, unfitted_items = pack_heightmap(items, [shelf], resolution=1.0)
+    return fitted_volume(placements[0][0]), len(unfitted_items)
+
+
+def run_exact(items, shelf):
+    fitted_items, _, unfitted_items, _ = pack_exact(items, shelf, time_limit=5.0)
+    return fitted_volume(fitted_items), len(unfitted_items)
+
+
+def fitted_volume(fitted_items):
+    return sum(float(np.prod(item["size"])) for item in fitted_items)
+
+
+# (name, runner, largest instance it is run on)
+ENGINES = [
+    # py3dbp is quadratic in pure Python, so skip it on large inputs
+    ("py3dbp", run_py3dbp, 200),
+    ("extreme points", run_extreme_points, 2000),
+    ("search", run_search, 1000),
+    ("heightmap", run_heightmap, 10000),
+    ("exact", run_exact, MAX_EXACT_ITEMS),
+]
+
+
+def measure(fn, items, shelf):
+    tracemalloc.start()
+    start = time.perf_counter()
+    packed_volume, unfitted = fn(items, shelf)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "time_s": elapsed,
+        "peak_mem_mb": peak / 1e6,
+        "utilization": packed_volume / float(np.prod(shelf["dimensions"])),
+        "unfitted": unfitted,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark every packing engine on seeded synthetic instances.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--mixes", nargs="+", choices=MIXES, default=MIXES)
+    parser.add_argument("--engines", nargs="+", choices=[name for name, _, _ in ENGINES], default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'engine':<16}{'mix':<8}{'items':>8}{'time (s)':>12}{'peak mem (MB)':>16}{'util':>8}{'unfitted':>10}")
+    for n in args.sizes:
+        for mix in args.mixes:
+            items, shelf = random_items(n, mix, args.seed)
+            for name, fn, max_items in ENGINES:
+                if (args.engines and name not in args.engines) or n > max_items:
+                    continue
+                run = measure(fn, items, shelf)
+                results.append({"engine": name, "mix": mix, "items": n, "seed": args.seed, **run})
+                print(f"{name:<16}{mix:<8}{n:>8}{run['time_s']:>12.3f}{run['peak_mem_mb']:>16.2f}"
+                      f"{run['utilization']:>8.3f}{run['unfitted']:>10}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"commit": git_commit(), "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
@@ -0,0 +1,205 @@
+import os
+import sys
+import random
+import argparse
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from packing import pack_shelf, pack_shelves, pack_heightmap, IncrementalPacker, LayoutCache, layout_key
+from packing.exact import pack_exact
+from packing.rotation import ROTATIONS
+from packing_benchmark import MIXES, random_items, count_items
+
+# Slack for comparing positions and sizes in cm
+TOLERANCE = 1e-6
+
+# Item mixes of packing_benchmark the engines are checked on; "skus" packs repeated items as blocks
+CHECK_MIXES = MIXES
+
+
+def boxes(fitted_items):
+    """(lo, hi) corners of the fitted items, with their rotations applied."""
+    lo = np.array([item["position"] for item in fitted_items], dtype=float).reshape(-1, 3)
+    size = [np.asarray(item["size"], dtype=float)[ROTATIONS[item["rotation"]]] for item in fitted_items]
+    return lo, lo + np.array(size).reshape(-1, 3)
+
+
+def layout_errors(placements, unfitted_items, total):
+    """Overlapping items, items outside their shelf and lost or duplicated items of a layout."""
+    errors = []
+    for s, (fitted_items, bin_size) in enumerate(placements):
+        lo, hi = boxes(fitted_items)
+        outside = np.flatnonzero(np.any(lo < -TOLERANCE, axis=1) | np.any(hi > np.asarray(bin_size) + TOLERANCE, axis=1))
+        if len(outside):
+            errors.append(f"shelf {s}: {len(outside)} item(s) outside the shelf")
+        overlap = np.all((lo[:, None] < hi[None] - TOLERANCE) & (lo[None] < hi[:, None] - TOLERANCE), axis=2)
+        pairs = int(np.triu(overlap, 1).sum())
+        if pairs:
+            errors.append(f"shelf {s}: {pairs} overlapping pair(s)")
+    fitted = sum(len(fitted_items) for fitted_items, _ in placements)
+    if fitted + len(unfitted_items) != total:
+        errors.append(f"{fitted} fitted + {len(unfitted_items)} unfitted != {total} items")
+    return errors
+
+
+def unsupported(fitted_items):
+    """Number of items neither on the shelf floor nor on the top face of another item."""
+    lo, hi = boxes(fitted_items)
+    on_top = np.abs(lo[:, None, 1] - hi[None, :, 1]) < 1e-4
+    for axis in (0, 2):
+        on_top &= np.minimum(hi[:, None, axis], hi[None, :, axis]) - np.maximum(lo[:, None, axis], lo[None, :, axis]) > 1e-4
+    return int(np.sum((lo[:, 1] > 1e-4) & ~on_top.any(axis=1)))
+
+
+def split_shelf(shelf, parts):
+    """The shelf cut into parts of decreasing width, to check multi-shelf packing."""
+    width, height, depth = shelf["dimensions"]
+    shares = np.arange(parts, 0, -1) / np.arange(parts, 0, -1).sum()
+    return [{"rotation": 0, "dimensions": [round(float(width * share), 1), height, depth]} for share in shares]
+
+
+def run_extreme_points(items, shelf):
+    packer = pack_shelf(items, shelf)
+    return [(packer.fitted_items, packer.bin_size)], packer.unfitted_items
+
+
+def run_shelves(items, shelf):
+    return pack_shelves(items, split_shelf(shelf, 3), workers=1)
+
+
+def run_heightmap(items, shelf):
+    return pack_heightmap(items, split_shelf(shelf, 3), resolution=0.5)
+
+
+# (name, runner) of every engine checked; runners return (placements, unfitted_items)
+ENGINES = [
+    ("pack_shelf", run_extreme_points),
+    ("pack_shelves", run_shelves),
+    ("pack_heightmap", run_heightmap),
+]
+
+
+def check_engines(seeds, n):
+    errors = []
+    for seed in seeds:
+        for mix in CHECK_MIXES:
+            items, shelf = random_items(n, mix, seed)
+            total = count_items(items)
+            for name, run in ENGINES:
+                placements, unfitted_items = run(items, shelf)
+                errors += [f"{name} {mix} seed {seed}: {e}" for e in layout_errors(placements, unfitted_items, total)]
+    return errors
+
+
+
+def check_exact(seeds):
+    errors = []
+    shelf = {"rotation": 0, "dimensions": [8, 8, 8]}
+    for seed in seeds:
+        rng = np.random.default_rng(seed)
+        items = [
+            {"id": i, "name": f"Item {i + 1}", "rotation": 1, "dimensions": [int(d) for d in rng.integers(2, 7, 3)]}
+            for i in range(8)
+        ]
+        fitted_items, bin_size, unfitted_items, _ = pack_exact(items, shelf, time_limit=5.0)
+        errors += [f"pack_exact seed {seed}: {e}" for e in layout_errors([(fitted_items, bin_size)], unfitted_items, 8)]
+        if unsupported(fitted_items):
+            errors.append(f"pack_exact seed {seed}: {unsupported(fitted_items)} item(s) without support")
+    return errors
+
+
+def check_incremental(seeds, n):
+    errors = []
+    for seed in seeds:
+        items, shelf = random_items(n, "mixed", seed)
+        shelves = split_shelf(shelf, 2)
+        packer = IncrementalPacker(shelves)
+        for item in items:
+            packer.add(item)
+        errors += [f"add seed {seed}: {e}" for e in layout_errors(packer.placements, packer.unfitted_items, n)]
+
+        removed = {item["id"] for item in items[::2]}
+        for item_id in removed:
+            if not packer.remove(item_id):
+                errors.append(f"remove seed {seed}: item {item_id} not found")
+        if packer.item_ids & removed:
+            errors.append(f"remove seed {seed}: removed items still in the layout")
+        if packer.remove(-1):
+            errors.append(f"remove seed {seed}: removing an unknown id reported success")
+        kept = n - len(removed)
+        errors += [f"remove seed {seed}: {e}" for e in layout_errors(packer.placements, packer.unfitted_items, kept)]
+
+        packer.sync(items, shelves)
+        errors += [f"sync seed {seed}: {e}" for e in layout_errors(packer.placements, packer.unfitted_items, n)]
+
+    # Free corners smaller than the repacked items stay usable for later additions
+    shelf = [{"rotation": 0, "dimensions": [10, 10, 10]}]
+    packer = IncrementalPacker(shelf)
+    packer.repack([{"id": 0, "name": "Large", "rotation": 0, "dimensions": [7, 10, 10]}])
+    if not packer.add({"id": 1, "name": "Small", "rotation": 0, "dimensions": [2, 2, 2]}):
+        errors.append("repack: a 2 cm cube no longer fits next to a 7 cm wide item")
+    return errors
+
+
+
+def check_layout_cache(seeds):
+    errors = []
+    for seed in seeds:
+        items, shelf = random_items(50, "skus", seed)
+        items += random_items(20, "mixed", seed)[0]
+        key = layout_key(items, [shelf])
+        shuffled = items[:]
+        random.Random(seed).shuffle(shuffled)
+        renamed = [dict(item, name=f"Renamed {i}") for i, item in enumerate(reversed(items))]
+        for name, variant in (("shuffled", shuffled), ("reversed and renamed", renamed)):
+            if layout_key(variant, [shelf]) != key:
+                errors.append(f"layout_key seed {seed}: {name} items give another key")
+        if layout_key(items, [shelf], seed=1) == key:
+            errors.append(f"layout_key seed {seed}: params do not change the key")
+
+    # Layouts survive a restart, and a damaged file only costs a miss
+    items, shelf = random_items(20, "mixed", 0)
+    with tempfile.TemporaryDirectory() as directory:
+        packers, _ = LayoutCache(directory=directory).pack_shelves(items, [shelf])
+        cache = LayoutCache(directory=directory)
+        reloaded, _ = cache.pack_shelves(items[::-1], [shelf])
+        if cache.hits != 1 or len(reloaded[0].fitted_items) != len(packers[0].fitted_items):
+            errors.append("layout cache: a saved layout was not loaded back")
+        if [name for name in os.listdir(directory) if not name.endswith(".json")]:
+            errors.append("layout cache: temporary files left behind")
+        for name in os.listdir(directory):
+            with open(os.path.join(directory, name), "w") as f:
+                f.write('{"shelves": [[[0, [0.0')
+        cache = LayoutCache(directory=directory)
+        placements, unfitted_items = cache.pack_shelves(items, [shelf])
+        if cache.misses != 1:
+            errors.append("layout cache: a damaged file was not treated as a miss")
+        errors += [f"layout cache: {e}" for e in layout_errors(
+            [(packer.fitted_items, packer.bin_size) for packer in placements], unfitted_items, 20)]
+    return errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the layouts of the packing engines for overlaps, "
+                                                 "items outside the shelf and lost items.")
+    parser.add_argument("--seeds", type=int, default=3)
+    parser.add_argument("--items", type=int, default=60)
+    args = parser.parse_args()
+
+    seeds = range(args.seeds)
+    checks = [
+        ("engines", lambda: check_engines(seeds, args.items)),
+        ("exact", lambda: check_exact(seeds)),
+        ("incremental", lambda: check_incremental(seeds, args.items)),
+        ("layout cache", lambda: check_layout_cache(seeds)),
+    ]
+    failed = 0
+    for name, check in checks:
+        errors = check()
+        print(f"{name:<14}{'ok' if not errors else f'{len(errors)} failure(s)'}")
+        for error in errors:
+            print(f"    {error}")
+        failed += len(errors)
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,63 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Modules app.py imports at startup, and what the first label costs on top
+STAGES = {
+    "labeling import": "import object_labeling",
+    "app imports": "import packing, utils.plotly_utils, detect_objects, vision_cache, object_labeling",
+    "first label": "import object_labeling, numpy as np; object_labeling.label_image(np.zeros((64, 64, 3), np.uint8))",
+}
+
+
+def source_tree(revision):
+    """Directory holding src/ at a git revision, or the working tree for None."""
+    if revision is None:
+        return os.path.join(ROOT, "src")
+    directory = tempfile.mkdtemp()
+    archive = subprocess.run(["git", "archive", revision, "src"], cwd=ROOT, capture_output=True, check=True).stdout
+    subprocess.run(["tar", "-x", "-C", directory], input=archive, check=True)
+    return os.path.join(directory, "src")
+
+
+def time_stage(src, statement, repeat):
+    """Best wall time of running a statement in a fresh interpreter, or the error it raised."""
+    code = f"import time; t = time.perf_counter(); {statement}; print(time.perf_counter() - t)"
+    best = None
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-c", code], cwd=src, capture_output=True, text=True)
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1]
+        elapsed = float(result.stdout.strip().splitlines()[-1])
+        best = elapsed if best is None else min(best, elapsed)
+    return best, None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time cold imports and the first label in fresh processes.")
+    parser.add_argument("--revisions", nargs="+", default=[None],
+                        help="Git revisions to compare, e.g. HEAD~1 HEAD; the working tree if not given")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'revision':<14}{'stage':<18}{'time (s)':>10}  error")
+    for revision in args.revisions:
+        src = source_tree(revision)
+        for stage in args.stages:
+            elapsed, error = time_stage(src, STAGES[stage], args.repeat)
+            results.append({"revision": revision or "working tree", "stage": stage, "time_s": elapsed, "error": error})
+            shown = f"{elapsed:>10.3f}" if elapsed is not None else f"{'-':>10}"
+            print(f"{revision or 'working tree':<14}{stage:<18}{shown}  {error or ''}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
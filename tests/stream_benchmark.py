@@ -0,0 +1,60 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import video_stream as vs
+
+ASSETS = os.path.join(os.path.dirname(__file__), "..", "assets")
+
+
+def synthetic_video(path, photo, frames=120, pan=0.1, seed=0):
+    """
+    Write a video of a still photo under a slow camera pan with hand jitter.
+
+    Stands in for a recorded clip when none is given.
+    """
+    rng = np.random.default_rng(seed)
+    image = cv2.imread(photo)
+    h, w = image.shape[:2]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 30, (w, h))
+    for k in range(frames):
+        dx = pan * w * np.sin(2 * np.pi * k / frames) + rng.normal(0, 1.0)
+        dy = rng.normal(0, 1.0)
+        shift = np.float32([[1, 0, dx], [0, 1, dy]])
+        writer.write(cv2.warpAffine(image, shift, (w, h), borderMode=cv2.BORDER_REPLICATE))
+    writer.release()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput of streaming measurement with and without tracking.")
+    parser.add_argument("--video", default=None, help="Recorded clip; a synthetic pan over --photo if not given")
+    parser.add_argument("--photo", default=os.path.join(ASSETS, "gold_lid_top.jpeg"))
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--intervals", type=int, nargs="+", default=[1, 5, vs.KEYFRAME_INTERVAL, 30])
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    video = args.video
+    if video is None:
+        video = os.path.join(tempfile.mkdtemp(), "synthetic.mp4")
+        synthetic_video(video, args.photo, args.frames)
+
+    results = []
+    print(f"{'keyframe interval':<20}{'frames':>8}{'keyframes':>11}{'fps':>8}{'dims (px)':>28}")
+    for interval in args.intervals:
+        stats = vs.measure_stream(video, keyframe_interval=interval)
+        dims = stats["last"]["dims"].round(1).tolist() if stats["last"] is not None else []
+        run = {"keyframe_interval": interval, "frames": stats["frames"], "keyframes": stats["keyframes"],
+               "fps": stats["fps"], "dims": dims}
+        results.append(run)
+        print(f"{interval:<20}{run['frames']:>8}{run['keyframes']:>11}{run['fps']:>8.1f}{str(dims):>28}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"video": video, "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
@@ -0,0 +1,75 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import detect_objects as dobj
+
+ASSETS = os.path.join(os.path.dirname(__file__), "..", "assets")
+
+
+def timed(fn, repeat):
+    """Median wall time of fn over repeat runs, and its last result."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)), result
+
+
+def drift(full, pyramid):
+    """Largest relative difference between matching pixel dimensions, in rank order."""
+    if len(full) != len(pyramid):
+        return float("inf")
+    worst = 0.0
+    for field in ("dA", "dB"):
+        for x, y in zip(full[field], pyramid[field]):
+            worst = max(worst, abs(x - y) / max(x, 1e-9))
+    return worst
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare full-resolution and pyramid contour detection on assets/.")
+    parser.add_argument("--max-side", type=int, default=dobj.PYRAMID_MAX_SIDE)
+    parser.add_argument("--upscale", type=float, default=1.0,
+                        help="Upscale the photos first, e.g. 2.5 to approximate 12 MP phone photos")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'image':<24}{'size':>12}{'full (ms)':>12}{'pyramid (ms)':>14}{'speedup':>10}{'drift':>10}")
+    for path in sorted(glob.glob(os.path.join(ASSETS, "*.jpeg"))):
+        image = cv2.imread(path)
+        if args.upscale != 1.0:
+            image = cv2.resize(image, None, fx=args.upscale, fy=args.upscale, interpolation=cv2.INTER_CUBIC)
+
+        full_time, full = timed(lambda: dobj.get_dims(dobj.preprocess(image)), args.repeat)
+        pyramid_time, pyramid = timed(
+            lambda: dobj.get_dims(dobj.preprocess(image, max_side=args.max_side)), args.repeat
+        )
+        run = {
+            "image": os.path.basename(path),
+            "size": list(image.shape[:2]),
+            "full_ms": full_time * 1000,
+            "pyramid_ms": pyramid_time * 1000,
+            "speedup": full_time / pyramid_time,
+            "drift": drift(full, pyramid),
+        }
+        results.append(run)
+        print(f"{run['image']:<24}{'x'.join(map(str, run['size'])):>12}{run['full_ms']:>12.1f}"
+              f"{run['pyramid_ms']:>14.1f}{run['speedup']:>10.2f}{run['drift']:>10.2%}")
+
+    speedup = sum(r["full_ms"] for r in results) / sum(r["pyramid_ms"] for r in results)
+    print(f"Overall speedup: {speedup:.2f}x, worst drift: {max(r['drift'] for r in results):.2%}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"max_side": args.max_side, "upscale": args.upscale, "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
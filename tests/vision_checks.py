@@ -0,0 +1,130 @@
+import os
+import sys
+import argparse
+import tempfile
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import detect_objects as dobj
+from label_cache import LabelCache, dhash
+
+
+def check_dimensions_batch(n, seed):
+    """get_3d_dimensions_batch against get_3d_dimensions row by row, ties and mismatches included."""
+    rng = np.random.default_rng(seed)
+    # Small integers give plenty of equal sides and rows on either side of the tolerance
+    top = rng.integers(1, 30, (n, 2)).astype(float)
+    front = rng.integers(1, 30, (n, 2)).astype(float)
+    batch = dobj.get_3d_dimensions_batch(top, front)
+
+    errors = []
+    for i in range(n):
+        expected = dobj.get_3d_dimensions(tuple(top[i]), tuple(front[i]))
+        if expected is None:
+            ok = np.isnan(batch[i]).all()
+        else:
+            ok = np.array_equal(batch[i], expected)
+        if not ok:
+            errors.append(f"row {i}: top {top[i].tolist()}, front {front[i].tolist()}: "
+                          f"{batch[i].tolist()} instead of {expected}")
+    matched = int(np.sum(~np.isnan(batch[:, 0])))
+    print(f"    {n} rows, {matched} matched, {n - matched} mismatched")
+    return errors
+
+
+def photo(seed, size=240):
+    """Smooth random texture standing in for a crop of an item."""
+    rng = np.random.default_rng(seed)
+    noise = rng.integers(0, 256, (size // 8, size // 8, 3), dtype=np.uint8)
+    return cv2.GaussianBlur(cv2.resize(noise, (size, size), interpolation=cv2.INTER_CUBIC), (0, 0), 3)
+
+
+def near_duplicates(image):
+    """The same crop rescaled, recompressed and brightened, as a new photo of the item would be."""
+    _, jpeg = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 60])
+    return {
+        "rescaled": cv2.resize(image, None, fx=0.6, fy=0.6, interpolation=cv2.INTER_AREA),
+        "recompressed": cv2.imdecode(jpeg, cv2.IMREAD_COLOR),
+        "brightened": cv2.convertScaleAbs(image, alpha=1.0, beta=20),
+    }
+
+
+def check_label_cache(count):
+    errors = []
+    images = [photo(seed) for seed in range(count)]
+    calls = []
+
+    def label_fn(crops):
+        calls.append(len(crops))
+        return [(f"item {len(calls)}-{i}", 0.9) for i in range(len(crops))]
+
+    cache = LabelCache(max_distance=6)
+    first = cache.label(images, label_fn)
+    if calls != [count]:
+        errors.append(f"first pass labeled {calls} crops instead of {count}")
+
+    for i, image in enumerate(images):
+        for name, variant in near_duplicates(image).items():
+            if cache.get(dhash(variant)) != first[i]:
+                errors.append(f"image {i}: {name} copy missed the cache")
+        if cache.label([image], label_fn) != [first[i]]:
+            errors.append(f"image {i}: relabeled although cached")
+    if len(calls) != 1:
+        errors.append(f"label_fn ran {len(calls) - 1} more time(s) for cached images")
+    others = [photo(seed) for seed in range(count, 2 * count)]
+    false_hits = sum(cache.get(dhash(image)) is not None for image in others)
+    if false_hits:
+        errors.append(f"{false_hits} of {count} unseen images hit the cache")
+    print(f"    {cache.hits} hits, {cache.misses} misses")
+
+    # Least recently used entries go first, and take their index entries with them
+    keys = [dhash(image) for image in images[:4]]
+    cache = LabelCache(max_entries=3)
+    for i, key in enumerate(keys[:3]):
+        cache.put(key, f"item {i}", 0.9)
+    cache.get(keys[0])
+    cache.put(keys[3], "item 3", 0.9)
+    if len(cache) != 3 or cache.get(keys[1]) is not None:
+        errors.append("the least recently used entry was not evicted")
+    if any(cache.get(key) is None for key in (keys[0], keys[2], keys[3])):
+        errors.append("a recently used entry was evicted")
+    if any(keys[1] in bucket for index in cache._index for bucket in index.values()):
+        errors.append("an evicted entry is still indexed")
+
+    # Entries survive a restart, and a damaged file only empties the cache
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "labels.json")
+        cache = LabelCache(path=path)
+        cache.label(images, label_fn)
+        if LabelCache(path=path).get(keys[0]) is None:
+            errors.append("a saved entry was not loaded back")
+        with open(path, "w") as f:
+            f.write('[["00ff", ["cup"')
+        if len(LabelCache(path=path)):
+            errors.append("a damaged cache file was not ignored")
+    return errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check vectorized measurement against the per-object code "
+                                                 "and the perceptual hash label cache.")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--images", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    checks = [
+        ("get_3d_dimensions_batch", lambda: check_dimensions_batch(args.rows, args.seed)),
+        ("LabelCache", lambda: check_label_cache(args.images)),
+    ]
+    failed = 0
+    for name, check in checks:
+        print(name)
+        errors = check()
+        print(f"    {'ok' if not errors else f'{len(errors)} failure(s)'}")
+        for error in errors[:20]:
+            print(f"    {error}")
+        failed += len(errors)
+    if failed:
+        sys.exit(1)